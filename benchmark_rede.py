@@ -0,0 +1,142 @@
+import argparse
+import glob
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+
+from coordinator import estimate_offset
+from proxy_rede import PERFIS, ProxyImpairment
+from round_trace import read_rounds
+
+"""
+Benchmark de precisão do algoritmo de Berkeley sob perfis de degradação de rede.
+Para cada perfil, executa o coordenador real atrás do proxy_rede e clientes reais
+(process.py) na mesma máquina. Como todos compartilham o mesmo relógio físico e partem
+de offset 0, qualquer offset estimado pelo coordenador é erro de medição, lido do trace
+das rodadas.
+"""
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+HOST = "127.0.0.1"
+
+
+def porta_livre() -> int:
+    """Reserva temporariamente uma porta TCP livre em HOST."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def executar_perfil(nome: str, clientes: int, rodadas: int):
+    """
+    Executa `rodadas` rodadas com `clientes` clientes através do proxy com o perfil `nome`.
+
+    :return: Lista de (erro de offset, RTT) de cada medição do coordenador.
+    """
+    ida, volta = PERFIS[nome]
+    porta_coord = porta_livre()
+    proxy = ProxyImpairment((HOST, 0), (HOST, porta_coord), ida, volta)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        coord = subprocess.Popen(
+            [
+                sys.executable,
+                "-u",
+                os.path.join(DIRETORIO, "coordinator.py"),
+                "--host",
+                HOST,
+                "--port",
+                str(porta_coord),
+                "--clients",
+                str(clientes),
+                "--rounds",
+                str(rodadas),
+                "--trace-dir",
+                pasta,
+            ],
+            cwd=pasta,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        porta_proxy = proxy.iniciar()
+        try:
+            # Aguarda o coordenador começar a escutar e segue drenando sua saída
+            for linha in coord.stdout:
+                if "Escutando" in linha:
+                    break
+            threading.Thread(target=coord.stdout.read, daemon=True).start()
+            for _ in range(rodadas):
+                # Offsets salvos da rodada anterior são descartados: todos partem de 0
+                for arquivo in glob.glob(os.path.join(pasta, "offset_*.txt")):
+                    os.remove(arquivo)
+                procs = [
+                    subprocess.Popen(
+                        [
+                            sys.executable,
+                            os.path.join(DIRETORIO, "process.py"),
+                            "--host",
+                            HOST,
+                            "--port",
+                            str(porta_proxy),
+                            "--id",
+                            f"B{i + 1}",
+                        ],
+                        cwd=pasta,
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                    )
+                    for i in range(clientes)
+                ]
+                for proc in procs:
+                    proc.wait()
+            coord.wait()
+        finally:
+            proxy.parar()
+            if coord.poll() is None:
+                coord.kill()
+
+        medicoes = []
+        for trace in glob.glob(os.path.join(pasta, "trace_*.bin")):
+            for _, _, registros in read_rounds(trace):
+                for t0, t2, client_time, rtt, _, _ in registros:
+                    medicoes.append((estimate_offset(t0, t2, client_time), rtt))
+        return medicoes
+
+
+def main():
+    """
+    Executa os perfis pedidos e imprime, para cada um, o erro médio, o erro absoluto
+    médio e p95, o RTT médio e o erro esperado pela assimetria de latência ((volta - ida) / 2).
+    """
+    parser = argparse.ArgumentParser(description="Benchmark de precisão sob degradação de rede")
+    parser.add_argument(
+        "--perfil", choices=sorted(PERFIS), action="append", help="Perfis (padrão: todos)"
+    )
+    parser.add_argument("--clients", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    for nome in args.perfil or list(PERFIS):
+        medicoes = executar_perfil(nome, args.clients, args.rounds)
+        ida, volta = PERFIS[nome]
+        esperado = (volta.latencia - ida.latencia) / 2
+        if not medicoes:
+            print(f"{nome}: nenhuma medição registrada")
+            continue
+        erros = [erro for erro, _ in medicoes]
+        absolutos = sorted(abs(erro) for erro in erros)
+        p95 = absolutos[min(int(len(absolutos) * 0.95), len(absolutos) - 1)]
+        print(
+            f"{nome}: {len(medicoes)} medições | erro médio {statistics.fmean(erros):+.6f}s "
+            f"(esperado {esperado:+.6f}s) | |erro| médio {statistics.fmean(absolutos):.6f}s "
+            f"| p95 {p95:.6f}s | RTT médio {statistics.fmean(r for _, r in medicoes):.6f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
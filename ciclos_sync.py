@@ -1,7 +1,8 @@
 import subprocess
-import time
+import argparse
 import csv
 import os
+import relogio
 
 """
 Script auxiliar para demonstrar didaticamente o Algoritmo de Berkeley para sincronização de relógios.
@@ -23,6 +24,9 @@ offsets_iniciais = {
     "P5": 2.0,
 }
 
+# Deriva do relógio de cada processo em ppm (vazio = sem deriva); ajustável com --deriva
+derivas = {}
+
 
 def registrar_offset_inicial(pid, offset):
     """
@@ -47,6 +51,7 @@ def run_coordinator():
     return subprocess.Popen(
         [
             "python",
+            "-u",
             "coordinator.py",
             "--host",
             HOST,
@@ -72,18 +77,54 @@ def run_client(pid, offset=None):
     cmd = ["python", "process.py", "--host", HOST, "--port", PORT, "--id", pid]
     if offset is not None:
         cmd += ["--offset", str(offset)]
+    if derivas.get(pid):
+        cmd += ["--deriva", str(derivas[pid])]
     return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
 
 
+def parse_deriva(texto):
+    """Converte 'PID=PPM' (argumento --deriva) em (pid, ppm)."""
+    pid, sep, ppm = texto.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Deriva inválida '{texto}', use PID=PPM")
+    return pid, float(ppm)
+
+
 def main():
     """
     Executa a simulação de vários ciclos do algoritmo de Berkeley:
     - Para cada ciclo, roda o coordenador e todos os clientes
     - Aguarda todos finalizarem
     - Registra progresso no terminal
+    Com --virtual, todos os nós rodam sob o mesmo relógio virtual e o intervalo entre ciclos
+    é saltado sem espera: o tempo saltado (e a deriva acumulada nele) é repassado aos
+    subprocessos de cada ciclo, enquanto as trocas de rede correm em tempo real.
     """
+    parser = argparse.ArgumentParser(description="Simulação de ciclos do algoritmo de Berkeley")
+    parser.add_argument("--ciclos", type=int, default=NUM_CICLOS)
+    parser.add_argument(
+        "--intervalo", type=float, default=2.0, help="Intervalo entre ciclos (s)"
+    )
+    parser.add_argument(
+        "--virtual",
+        action="store_true",
+        help="Salta o intervalo entre ciclos em tempo virtual, sem esperar",
+    )
+    parser.add_argument(
+        "--deriva",
+        type=parse_deriva,
+        action="append",
+        default=[],
+        help="Deriva de um processo no formato PID=PPM (repetível)",
+    )
+    args = parser.parse_args()
+    derivas.update(args.deriva)
+
+    if args.virtual:
+        relogio.definir_relogio(relogio.RelogioVirtual())
+
     print(
-        f"⏳ Iniciando {NUM_CICLOS} ciclos de sincronização com {NUM_CLIENTES} clientes...\n"
+        f"⏳ Iniciando {args.ciclos} ciclos de sincronização com {NUM_CLIENTES} clientes...\n"
     )
     # Grava ciclo 0 com offset inicial
 
@@ -91,10 +132,17 @@ def main():
         offset = offsets_iniciais.get(pid, 0.0)
         registrar_offset_inicial(pid, offset)
 
-    for ciclo in range(1, NUM_CICLOS + 1):
+    for ciclo in range(1, args.ciclos + 1):
         print(f"--- Ciclo {ciclo} ---")
+        # Relógio compartilhado com os subprocessos via variável de ambiente, incluindo
+        # o tempo virtual já saltado nos intervalos anteriores
+        os.environ[relogio.VARIAVEL_AMBIENTE] = relogio.obter_relogio().especificacao()
 
         coord_proc = run_coordinator()
+        # Aguarda o coordenador começar a escutar antes de iniciar os clientes
+        for linha in coord_proc.stdout:
+            if b"Escutando" in linha:
+                break
 
         clientes = []
         for pid in PROCESS_IDS:
@@ -106,7 +154,7 @@ def main():
         coord_proc.wait()
 
         print(f"✓ Ciclo {ciclo} concluído\n")
-        time.sleep(2)
+        relogio.dormir(args.intervalo)
 
     print("✅ Todos os ciclos finalizados.")
 
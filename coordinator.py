@@ -6,6 +6,12 @@ import argparse
 import statistics
 import os
 import csv
+import queue
+import math
+import relogio
+import tabela_offsets
+from profiling import RoundProfiler
+from round_trace import TraceWriter
 
 """
 Coordenador do Algoritmo de Berkeley para sincronização de relógios em sistemas distribuídos.
@@ -13,14 +19,14 @@ Aceita conexões de múltiplos clientes, calcula offsets relativos e envia ajust
 Do ponto de vista da literatura, representa o 'Master'
 """
 
-# Armazena offsets recebidos dos clientes
-received_offsets = []
+# Grupo usado por clientes que não informam grupo no handshake (compatibilidade)
+DEFAULT_GROUP = "default"
 
-# Lista de conexões ativas
-connections = []
+# Tempo máximo (s) aguardando a mensagem "JOIN <grupo>" após aceitar a conexão
+JOIN_TIMEOUT = 1.0
 
-# Lock para  acesso seguro às listas em threads paralelas
-received_lock = threading.Lock()
+# Tempo total padrão (s) para aceitar as conexões de uma rodada
+ACCEPT_TIMEOUT = 15.0
 
 
 def log(msg):
@@ -28,19 +34,214 @@ def log(msg):
     print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
 
 
-def persist_offset(offset: float):
+class SyncGroup:
     """
-    Salva o offset atual do coordenador em arquivo local (coordinator.txt)
-    e atualiza o histórico de ciclos no CSV (coordinator.csv)
+    Grupo de sincronização independente hospedado pelo coordenador.
+    Cada grupo tem seus próprios membros, agenda de rodadas, agregação e histórico, e executa
+    suas rodadas em uma thread própria, concorrente às dos demais grupos.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        clients: int,
+        rounds: int = 1,
+        timeout_accept=ACCEPT_TIMEOUT,
+        trace=None,
+        profiler=None,
+        interval: float = 0.0,
+    ):
+        self.name = name
+        self.clients = clients
+        self.rounds = rounds  # 0 = rodadas indefinidamente
+        self.timeout_accept = timeout_accept  # Tempo total para aceitar as conexões
+        self.interval = interval  # Espera (s) entre o fim de uma rodada e o início da próxima
+
+        # Armazena offsets recebidos dos clientes
+        self.received_offsets = []
+        # Lista de conexões ativas
+        self.connections = []
+        # Lock para acesso seguro às listas em threads paralelas
+        self.received_lock = threading.Lock()
+        # Conexões já associadas ao grupo, aguardando a rodada
+        self.pending = queue.Queue()
+        self.finished = threading.Event()
+        # Torna atômicos o "verifica finished e enfileira" do roteamento e o "encerra e esvazia" do grupo
+        self.pending_lock = threading.Lock()
+        # Medições brutas (t0, t2, client_time, rtt) por conexão, para o trace
+        self.measurements = {}
+        # TraceWriter opcional para gravar as rodadas do grupo
+        self.trace = trace
+        # Profiling opcional por fase da rodada (desabilitado por padrão)
+        self.profiler = profiler or RoundProfiler()
+
+    def log(self, msg):
+        """Log com o nome do grupo (omitido para o grupo padrão)."""
+        log(msg if self.name == DEFAULT_GROUP else f"[{self.name}] {msg}")
+
+    def run(self):
+        """Executa as rodadas configuradas do grupo."""
+        try:
+            current = 0
+            while self.rounds == 0 or current < self.rounds:
+                if current and self.interval > 0:
+                    # Espera real: os clientes das próximas rodadas chegam no tempo de parede
+                    time.sleep(self.interval)
+                current += 1
+                self.profiler.start_round(current)
+                try:
+                    self.run_round()
+                finally:
+                    self.close_connections()
+                    self.profiler.end_round()
+        finally:
+            if self.trace is not None:
+                self.trace.close()
+            # Conexões que chegaram após a última rodada
+            with self.pending_lock:
+                self.finished.set()
+                while not self.pending.empty():
+                    conn, _ = self.pending.get_nowait()
+                    conn.close()
+
+    def enqueue(self, conn, addr) -> bool:
+        """Enfileira a conexão para a próxima rodada; False se o grupo já encerrou."""
+        with self.pending_lock:
+            if self.finished.is_set():
+                return False
+            self.pending.put((conn, addr))
+            return True
+
+    def close_connections(self):
+        """Encerra as conexões restantes da rodada (ex.: outliers, que não recebem ajuste)."""
+        for conn in self.connections:
+            conn.close()
+
+    def run_round(self):
+        """
+        Executa uma rodada do algoritmo para o grupo:
+        - Aguarda os clientes do grupo e inicia threads para cada um
+        - Coleta offsets, remove outliers e calcula média
+        - Envia ajustes aos clientes e persiste o offset do coordenador
+        """
+        self.received_offsets = []
+        self.connections = []
+        self.measurements = {}
+        threads = []
+        round_time = relogio.agora()
+        # A janela de aceitação limita esperas de rede reais, então usa tempo real mesmo sob relógio virtual
+        start_time = time.monotonic()
+
+        # Aceita conexões até o número de clientes esperado ou até o tempo limite
+        with self.profiler.phase("accept"):
+            while (
+                len(self.connections) < self.clients
+                and time.monotonic() - start_time < self.timeout_accept
+            ):
+                try:
+                    conn, addr = self.pending.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                self.connections.append(conn)
+                t = threading.Thread(target=self.serve_client, args=(conn, addr))
+                t.start()
+                threads.append(t)
+
+        # Espera todas as threads terminarem
+        with self.profiler.phase("join"):
+            for t in threads:
+                t.join()
+
+        if not self.received_offsets:
+            self.log("Nenhum cliente respondeu a tempo.")
+            return
+
+        with self.profiler.phase("statistics"):
+            filtered = remove_outliers(self.received_offsets, self.log)
+            offset_medio = mean_offset(filtered) if filtered else math.nan
+        if not filtered:
+            self.log("Todos os offsets foram descartados como outliers.")
+            with self.profiler.phase("persistence"):
+                self.record_trace(round_time, offset_medio, filtered)
+            return
+
+        self.log(f"Offset médio final: {offset_medio:+.3f} segundos")
+
+        # Aplica o ajuste ao próprio coordenador e salva
+        adjusted_time = relogio.agora() + offset_medio
+        self.log(f"Relógio do coordenador ajustado em {offset_medio:+.3f}s")
+        self.log(
+            f"Novo horário do coordenador: {datetime.fromtimestamp(adjusted_time).strftime('%H:%M:%S')}"
+        )
+        with self.profiler.phase("persistence"):
+            self.record_trace(round_time, offset_medio, filtered)
+            persist_offset(offset_medio, self.name)
+
+        # Envia o ajuste calculado para cada cliente
+        with self.profiler.phase("broadcast"):
+            for conn, o in filtered:
+                try:
+                    adjustment = offset_medio - o
+                    conn.sendall(str(adjustment).encode())
+                    time.sleep(0.1)  # espera real: dá tempo ao cliente de ler o ajuste
+                    conn.shutdown(socket.SHUT_RDWR)
+                    conn.close()
+                except:
+                    self.log("Erro ao enviar ajuste ao cliente.")
+
+        self.log("Sincronização concluída com sucesso.")
+
+    def serve_client(self, conn, addr):
+        """Executa handle_client medindo a fase de I/O do cliente (thread própria)."""
+        with self.profiler.phase("handle_client"):
+            handle_client(conn, addr, self)
+
+    def record_trace(self, round_time, offset_medio, filtered):
+        """Grava a rodada no trace (se habilitado), com a decisão de outlier e o ajuste de cada cliente."""
+        if self.trace is None:
+            return
+        kept = {conn for conn, _ in filtered}
+        clients = []
+        for conn, o in self.received_offsets:
+            t0, t2, client_time, rtt = self.measurements[conn]
+            outlier = conn not in kept
+            adjustment = math.nan if outlier else offset_medio - o
+            clients.append((t0, t2, client_time, rtt, outlier, adjustment))
+        try:
+            self.trace.write_round(round_time, offset_medio, clients)
+        except Exception as e:
+            self.log(f"Erro ao gravar trace: {e}")
+
+
+def coordinator_file(group: str, ext: str) -> str:
+    """Nome do arquivo de offset do coordenador para o grupo (ex.: offset_coordinator-g1.csv)."""
+    if group == DEFAULT_GROUP:
+        return f"offset_coordinator{ext}"
+    return f"offset_coordinator-{group}{ext}"
+
+
+def persist_offset(offset: float, group: str = DEFAULT_GROUP):
+    """
+    Salva o offset atual do coordenador em arquivo local (coordinator.txt), publica-o na
+    tabela compartilhada e atualiza o histórico de ciclos no CSV (coordinator.csv), separados por grupo
     """
     try:
-        with open("offset_coordinator.txt", "w") as f:
+        with open(coordinator_file(group, ".txt"), "w") as f:
             f.write(f"{offset:+.3f}")
     except Exception as e:
         log(f"[Coordenador] Erro ao salvar offset: {e}")
 
     try:
-        csv_path = "offset_coordinator.csv"
+        # Mesmo id usado pelo dashboard para o arquivo .txt (ex.: coordinator-g1)
+        pid = coordinator_file(group, "")[len("offset_") :]
+        tabela_offsets.publicar(
+            pid, offset, tabela_offsets.STATUS_SINCRONIZADO, relogio.agora()
+        )
+    except Exception as e:
+        log(f"[Coordenador] Erro ao publicar offset na tabela: {e}")
+
+    try:
+        csv_path = coordinator_file(group, ".csv")
         file_exists = os.path.isfile(csv_path)
         next_cycle = 1
         if file_exists:
@@ -56,27 +257,33 @@ def persist_offset(offset: float):
         log(f"[Coordenador] Erro ao gravar CSV: {e}")
 
 
-def handle_client(conn, addr):
+def estimate_offset(t0: float, t2: float, client_time: float) -> float:
+    """Offset do cliente em relação ao ponto médio da troca (assume RTT simétrico)."""
+    coord_midpoint = t0 + (t2 - t0) / 2
+    return client_time - coord_midpoint
+
+
+def handle_client(conn, addr, group: SyncGroup):
     """
     Lida com um cliente conectado:
     - Solicita o horário atual do cliente
     - Calcula o offset com base no RTT
-    - Armazena o offset para posterior ajuste
+    - Armazena o offset no grupo para posterior ajuste
     """
+    log = group.log
 
     log(f"Conectado a: {addr}")
     try:
         conn.settimeout(10.0)
-        t0 = time.time()
+        t0 = relogio.agora()
         conn.sendall(b"REQUEST_TIME")
 
         data = conn.recv(1024)
-        t2 = time.time()
+        t2 = relogio.agora()
 
         client_time = float(data.decode())
         rtt = t2 - t0
-        coord_midpoint = t0 + rtt / 2
-        offset = client_time - coord_midpoint
+        offset = estimate_offset(t0, t2, client_time)
 
         log(f"t0: {t0:.3f}, t2: {t2:.3f}, RTT: {rtt:.3f}s")
         log(
@@ -84,8 +291,9 @@ def handle_client(conn, addr):
         )
         log(f"Offset estimado (com RTT/2): {offset:+.3f}s")
 
-        with received_lock:
-            received_offsets.append((conn, offset))
+        with group.received_lock:
+            group.received_offsets.append((conn, offset))
+            group.measurements[conn] = (t0, t2, client_time, rtt)
     except socket.timeout:
         log(f"[TIMEOUT] Cliente {addr} não respondeu a tempo.")
         conn.close()
@@ -94,56 +302,18 @@ def handle_client(conn, addr):
         conn.close()
 
 
-def main():
-    """
-    Função principal do coordenador:
-    - Cria socket servidor e aguarda conexões
-    - Inicia threads para cada cliente conectado
-    - Coleta offsets e calcula média
-    - Remove outliers e envia ajustes aos clientes
-    - Aplica ajuste no próprio relógio e persiste valor
+def remove_outliers(received_offsets, log=log):
     """
-    parser = argparse.ArgumentParser(description="Coordenador do algoritmo de Berkeley")
-    parser.add_argument("--host", type=str, default="0.0.0.0")
-    parser.add_argument("--port", type=int, default=5000)
-    parser.add_argument("--clients", type=int, default=5)
-    args = parser.parse_args()
-
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.bind((args.host, args.port))
-    server.listen(args.clients)
-    log(f"Escutando {args.host}:{args.port}, aguardando {args.clients} clientes")
-
-    threads = []
-    timeout_accept = 15  # Tempo total para aceitar as conexões
-    start_time = time.time()
-
-    # Aceita conexões até o número de clientes esperado ou até o tempo limite
-    while len(connections) < args.clients and time.time() - start_time < timeout_accept:
-        server.settimeout(1.0)
-        try:
-            conn, addr = server.accept()
-            connections.append(conn)
-            t = threading.Thread(target=handle_client, args=(conn, addr))
-            t.start()
-            threads.append(t)
-        except socket.timeout:
-            continue
-
-    # Espera todas as threads terminarem
-    for t in threads:
-        t.join()
-
-    if not received_offsets:
-        log("Nenhum cliente respondeu a tempo.")
-        return
+    Remove outliers: offsets fora de 1 desvio padrão da média, considerando também
+    o offset do coordenador (para esta demonstração, considerado como 0.0).
 
-    # Extrai os offsets dos clientes e adiciona o do coordenador (para esta demonstração, considerado como 0.0)
+    :param received_offsets: Lista de (conexão, offset) dos clientes.
+    :return: Lista filtrada de (conexão, offset).
+    """
     offsets = [offset for _, offset in received_offsets]
     offsets.append(0.0)  # coordenador
     log(f"Offset do coordenador (0.000s) incluído no cálculo")
 
-    # Remove outliers: offsets fora de 1 desvio padrão
     if len(offsets) > 1:
         mean = statistics.mean(offsets)
         stdev = statistics.stdev(offsets)
@@ -151,37 +321,162 @@ def main():
         log(f"Outliers removidos: {len(received_offsets) - len(filtered)}")
     else:
         filtered = received_offsets
+    return filtered
 
-    if not filtered:
-        log("Todos os offsets foram descartados como outliers.")
-        return
 
-    # Recalcula offset médio com clientes filtrados + coordenador
+def mean_offset(filtered) -> float:
+    """Offset médio entre os clientes filtrados e o coordenador."""
     final_offsets = [o for _, o in filtered] + [0.0]
-    offset_medio = statistics.mean(final_offsets)
-    log(f"Offset médio final: {offset_medio:+.3f} segundos")
-
-    # Aplica o ajuste ao próprio coordenador e salva
-    adjusted_time = time.time() + offset_medio
-    log(f"Relógio do coordenador ajustado em {offset_medio:+.3f}s")
-    log(
-        f"Novo horário do coordenador: {datetime.fromtimestamp(adjusted_time).strftime('%H:%M:%S')}"
+    return statistics.mean(final_offsets)
+
+
+def parse_group(spec: str):
+    """
+    Converte 'nome:clientes[:rodadas[:intervalo[:timeout]]]' (argumento --group) em
+    (nome, clientes, rodadas, intervalo, timeout); campos omitidos ficam como None
+    e assumem os valores globais (--rounds, --interval, --accept-timeout).
+    """
+    name, *fields = spec.split(":")
+    if not fields or len(fields) > 4 or not name or os.path.basename(name) != name:
+        raise argparse.ArgumentTypeError(
+            f"Grupo inválido '{spec}', use nome:clientes[:rodadas[:intervalo[:timeout]]]"
+        )
+    try:
+        clients = int(fields[0])
+        rounds = int(fields[1]) if len(fields) > 1 and fields[1] else None
+        interval = float(fields[2]) if len(fields) > 2 and fields[2] else None
+        timeout = float(fields[3]) if len(fields) > 3 and fields[3] else None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Grupo inválido '{spec}': valores numéricos esperados")
+    return name, clients, rounds, interval, timeout
+
+
+def route_client(conn, addr, groups):
+    """
+    Lê o handshake "JOIN <grupo>" do cliente e encaminha a conexão ao grupo.
+    Clientes que não enviam handshake a tempo entram no grupo padrão.
+    """
+    name = DEFAULT_GROUP
+    try:
+        conn.settimeout(JOIN_TIMEOUT)
+        data = conn.recv(1024).decode().strip()
+        if data.startswith("JOIN "):
+            name = data[len("JOIN ") :].strip()
+    except socket.timeout:
+        pass
+    except Exception as e:
+        log(f"Erro no handshake com {addr}: {e}")
+        conn.close()
+        return
+
+    group = groups.get(name)
+    if group is None or not group.enqueue(conn, addr):
+        log(f"Cliente {addr} recusado: grupo '{name}' indisponível.")
+        try:
+            conn.sendall(b"UNKNOWN_GROUP")
+        except OSError:
+            pass
+        conn.close()
+
+
+def main():
+    """
+    Função principal do coordenador:
+    - Cria socket servidor e aguarda conexões
+    - Encaminha cada cliente ao seu grupo conforme o handshake
+    - Executa as rodadas de cada grupo concorrentemente (coleta, outliers, média e ajustes)
+    - Aplica ajuste no próprio relógio e persiste valor por grupo
+    """
+    parser = argparse.ArgumentParser(description="Coordenador do algoritmo de Berkeley")
+    parser.add_argument("--host", type=str, default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=5)
+    parser.add_argument(
+        "--group",
+        type=parse_group,
+        action="append",
+        help=(
+            "Grupo de sincronização no formato nome:clientes[:rodadas[:intervalo[:timeout]]] "
+            "(repetível)"
+        ),
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=1, help="Rodadas por grupo (0 = indefinidamente)"
+    )
+    parser.add_argument(
+        "--interval", type=float, default=0.0, help="Intervalo entre rodadas de um grupo (s)"
+    )
+    parser.add_argument(
+        "--accept-timeout",
+        type=float,
+        default=ACCEPT_TIMEOUT,
+        help="Tempo para aceitar as conexões de cada rodada (s)",
+    )
+    parser.add_argument(
+        "--trace-dir",
+        type=str,
+        default=None,
+        help="Diretório onde gravar o trace binário das rodadas (trace_<grupo>.bin)",
+    )
+    parser.add_argument(
+        "--deriva", type=float, default=0.0, help="Deriva do relógio local (ppm)"
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=str,
+        default=None,
+        help="Habilita o profiling por rodada, gravando os resultados neste diretório",
+    )
+    parser.add_argument(
+        "--profile-every", type=int, default=1, help="Perfila 1 a cada N rodadas"
     )
-    persist_offset(offset_medio)
+    args = parser.parse_args()
+    # A origem da deriva é persistida junto ao offset para acumular entre execuções
+    relogio.aplicar_deriva(args.deriva, coordinator_file(DEFAULT_GROUP, ".origem"))
+
+    specs = args.group or [(DEFAULT_GROUP, args.clients, None, None, None)]
+    if args.trace_dir:
+        os.makedirs(args.trace_dir, exist_ok=True)
+    groups = {
+        name: SyncGroup(
+            name,
+            clients,
+            args.rounds if rounds is None else rounds,
+            timeout_accept=args.accept_timeout if timeout is None else timeout,
+            trace=(
+                TraceWriter(os.path.join(args.trace_dir, f"trace_{name}.bin"))
+                if args.trace_dir
+                else None
+            ),
+            profiler=RoundProfiler(args.profile_dir, args.profile_every, f"coordinator-{name}"),
+            interval=args.interval if interval is None else interval,
+        )
+        for name, clients, rounds, interval, timeout in specs
+    }
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if os.name != "nt":
+        # Permite reabrir a porta logo após o ciclo anterior (conexões em TIME_WAIT)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((args.host, args.port))
+    server.listen(sum(g.clients for g in groups.values()))
+    server.settimeout(1.0)
+    for g in groups.values():
+        log(f"Escutando {args.host}:{args.port}, grupo '{g.name}' aguardando {g.clients} clientes")
 
-    # Envia o ajuste calculado para cada cliente
-    for conn, o in filtered:
+    workers = [threading.Thread(target=g.run) for g in groups.values()]
+    for w in workers:
+        w.start()
+
+    # Aceita conexões enquanto algum grupo ainda tiver rodadas pendentes
+    while any(w.is_alive() for w in workers):
         try:
-            adjustment = offset_medio - o
-            conn.sendall(str(adjustment).encode())
-            time.sleep(0.1)
-            conn.shutdown(socket.SHUT_RDWR)
-            conn.close()
-        except:
-            log("Erro ao enviar ajuste ao cliente.")
+            conn, addr = server.accept()
+        except socket.timeout:
+            continue
+        threading.Thread(target=route_client, args=(conn, addr, groups)).start()
 
     server.close()
-    log("Sincronização concluída com sucesso.")
 
 
 if __name__ == "__main__":
@@ -1,11 +1,13 @@
 import dash
-from dash import html, dcc, Output, Input
+from dash import html, dcc, Output, Input, State
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 import os
-import time
+import relogio
+import tabela_offsets
 from datetime import datetime
 import math
+import numpy as np
 import pandas as pd
 
 """
@@ -14,14 +16,37 @@ Utiliza os valores salvos localmente de offset e de ciclos para plotar dinamicam
 convergência dos horários. 
 """
 
-# Detecta processos automaticamente com base em arquivos .txt
-PROCESSOS = sorted(
-    [
+# Tabela compartilhada de offsets atuais (aberta sob demanda, ver obter_offsets_atuais)
+_tabela = None
+
+
+def detectar_processos():
+    """
+    Detecta processos automaticamente com base em arquivos .txt e na tabela compartilhada
+    """
+    processos = {
         f.split("_")[1].split(".")[0]
         for f in os.listdir(".")
         if f.startswith("offset_") and f.endswith(".txt")
-    ]
-)
+    }
+    tabela = tabela_offsets.abrir_leitura()
+    if tabela is not None:
+        processos.update(tabela.ler_todos())
+        tabela.fechar()
+    return sorted(processos)
+
+
+PROCESSOS = detectar_processos()
+
+# Número máximo de pontos enviados ao navegador por processo no gráfico geral.
+# Acima disso a série é reduzida por buckets de mínimo/máximo (~1 par por coluna de pixel).
+PONTOS_MAXIMOS = 2000
+
+# Cache das séries lidas dos CSVs: pid -> ((mtime, tamanho), ciclos, offsets)
+_cache_series = {}
+
+# Idade máxima (s) da última sincronização publicada antes de o card ser exibido como desatualizado
+SYNC_EXPIRADA = 60.0
 
 # Inicializa o app Dash
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.SLATE])
@@ -39,6 +64,20 @@ def obter_offset(pid):
         return None
 
 
+def obter_offsets_atuais():
+    """
+    Lê de uma vez os offsets atuais publicados na tabela compartilhada (offsets.tbl).
+    Retorna um dicionário pid -> (offset, última sincronização, status), vazio se a tabela
+    ainda não existir.
+    """
+    global _tabela
+    if _tabela is None:
+        _tabela = tabela_offsets.abrir_leitura()
+        if _tabela is None:
+            return {}
+    return _tabela.ler_todos()
+
+
 def formatar_horario(timestamp):
     """
     Converte timestamp para string formatada: HH:MM:SS
@@ -120,9 +159,13 @@ def gerar_ponteiros_analogicos(timestamp):
     return fig
 
 
-def construir_card(pid, agora, offset):
+def construir_card(
+    pid, agora, offset, status=tabela_offsets.STATUS_SINCRONIZADO, ultima_sync=None
+):
     """
     Constrói um carda para cada processo, com horário ajustado, delta e relógio analógico logo abaixo.
+    Processos sem ajuste na última rodada (ex.: outliers) ou com sincronização mais antiga que
+    SYNC_EXPIRADA não são exibidos como sincronizados.
     """
     if offset is None:
         return dbc.Card(
@@ -138,7 +181,17 @@ def construir_card(pid, agora, offset):
 
     ajustado = agora + offset
     delta = abs(agora - ajustado)
-    cor = "success" if delta <= 0.05 else "danger"
+    situacao = None
+    if status != tabela_offsets.STATUS_SINCRONIZADO:
+        cor = "warning"
+        situacao = f"⚠️ {tabela_offsets.NOMES_STATUS.get(status, status)}"
+    elif ultima_sync is not None and agora - ultima_sync > SYNC_EXPIRADA:
+        cor = "secondary"
+        situacao = "⏳ desatualizado"
+    else:
+        cor = "success" if delta <= 0.05 else "danger"
+    if situacao is not None and ultima_sync is not None:
+        situacao += f" (última publicação às {formatar_horario(ultima_sync)})"
 
     return dbc.Card(
         [
@@ -147,6 +200,7 @@ def construir_card(pid, agora, offset):
                 [
                     html.Div(f"⏰ {formatar_horario(ajustado)}", className="fs-4"),
                     html.Div(f"offset: {offset:+.3f}s | Δ: {delta:.3f}s"),
+                    *([html.Div(situacao)] if situacao else []),
                     dcc.Graph(
                         figure=gerar_ponteiros_analogicos(ajustado),
                         config={"displayModeBar": False},
@@ -159,9 +213,83 @@ def construir_card(pid, agora, offset):
     )
 
 
-def gerar_grafico_geral():
+def carregar_serie(pid):
+    """
+    Lê o histórico 'offset_<pid>.csv' como arrays numpy (ciclos, offsets).
+    Reaproveita a última leitura enquanto o arquivo não for modificado.
+    """
+    caminho = f"offset_{pid}.csv"
+    info = os.stat(caminho)
+    chave = (info.st_mtime_ns, info.st_size)
+    em_cache = _cache_series.get(pid)
+    if em_cache is not None and em_cache[0] == chave:
+        return em_cache[1], em_cache[2]
+
+    df = pd.read_csv(
+        caminho, usecols=["cycle", "offset"], dtype={"cycle": "int64", "offset": "float64"}
+    )
+    ciclos = df["cycle"].to_numpy()
+    offsets = df["offset"].to_numpy()
+    _cache_series[pid] = (chave, ciclos, offsets)
+    return ciclos, offsets
+
+
+def reduzir_pontos(x, y, limite=PONTOS_MAXIMOS):
+    """
+    Reduz uma série para no máximo ~`limite` pontos mantendo o mínimo e o máximo
+    de cada bucket, de forma que picos e vales continuem visíveis no gráfico.
+    Séries que já cabem no limite são devolvidas intactas (resolução total).
+    """
+    n = len(x)
+    if n <= limite:
+        return x, y
+
+    tamanho = -(-n // max(limite // 2, 1))
+    baldes = -(-n // tamanho)
+    preenchido = np.full(baldes * tamanho, np.nan)
+    preenchido[:n] = y
+    matriz = preenchido.reshape(baldes, tamanho)
+
+    base = np.arange(baldes) * tamanho
+    indices = np.concatenate(
+        (
+            [0, n - 1],
+            base + np.nanargmin(matriz, axis=1),
+            base + np.nanargmax(matriz, axis=1),
+        )
+    )
+    indices = np.unique(indices)
+    return x[indices], y[indices]
+
+
+def extrair_intervalo_x(relayout, atual=None):
+    """
+    Atualiza o intervalo visível do eixo X (ciclos) a partir de um evento relayoutData.
+    O relayoutData contém só o último evento, então eventos sem intervalo X (zoom apenas
+    no eixo Y, redimensionamento da janela) mantêm o intervalo `atual`. Retorna None
+    apenas quando o eixo X volta ao zoom automático (visão completa).
+    """
+    if not relayout:
+        return atual
+    if relayout.get("xaxis.autorange"):
+        return None
+    try:
+        if "xaxis.range[0]" in relayout and "xaxis.range[1]" in relayout:
+            return [float(relayout["xaxis.range[0]"]), float(relayout["xaxis.range[1]"])]
+        if "xaxis.range" in relayout:
+            inicio, fim = relayout["xaxis.range"]
+            return [float(inicio), float(fim)]
+    except (TypeError, ValueError):
+        pass
+    return atual
+
+
+def gerar_grafico_geral(intervalo=None):
     """
     Gera gráfico de linha com a evolução dos offsets de cada processo ao longo dos ciclos.
+    Históricos longos são reduzidos no servidor antes do envio ao navegador; quando há
+    zoom (`intervalo` de ciclos visível), apenas esse trecho é reduzido, chegando à
+    resolução total quando o trecho cabe em PONTOS_MAXIMOS.
     """
     fig = go.Figure()
     cores = [
@@ -179,12 +307,19 @@ def gerar_grafico_geral():
 
     for i, pid in enumerate(PROCESSOS):
         try:
-            df = pd.read_csv(f"offset_{pid}.csv")
+            ciclos, offsets = carregar_serie(pid)
+            if intervalo is not None:
+                # Inclui um ponto de cada lado para a linha não ser cortada na borda
+                inicio = max(np.searchsorted(ciclos, intervalo[0]) - 1, 0)
+                fim = np.searchsorted(ciclos, intervalo[1], side="right") + 1
+                ciclos, offsets = ciclos[inicio:fim], offsets[inicio:fim]
+            reduzido = len(ciclos) > PONTOS_MAXIMOS
+            ciclos, offsets = reduzir_pontos(ciclos, offsets)
             fig.add_trace(
                 go.Scatter(
-                    x=df["cycle"],
-                    y=df["offset"],
-                    mode="lines+markers",
+                    x=ciclos,
+                    y=offsets,
+                    mode="lines" if reduzido else "lines+markers",
                     name=pid,
                     line=dict(color=cores[i % len(cores)]),
                 )
@@ -200,6 +335,7 @@ def gerar_grafico_geral():
         paper_bgcolor="rgba(0,0,0,0)",
         plot_bgcolor="rgba(0,0,0,0)",
         height=300,
+        uirevision="grafico-geral",  # preserva o zoom do usuário entre atualizações
         margin=dict(l=30, r=30, t=40, b=40),
         legend=dict(
             orientation="h",
@@ -240,6 +376,7 @@ app.layout = dbc.Container(
         dcc.Interval(id="intervalo-atualizacao", interval=1000, n_intervals=0),
         html.Hr(),
         dcc.Graph(id="grafico-geral", config={"displayModeBar": False}),
+        dcc.Store(id="intervalo-x", data=None),  # último intervalo X com zoom (ou None)
     ],
     fluid=True,
 )
@@ -250,28 +387,49 @@ app.layout = dbc.Container(
     Output("cards-processos", "children"),
     Output("grafico-geral", "figure"),
     Input("intervalo-atualizacao", "n_intervals"),
+    Input("intervalo-x", "data"),
 )
-def atualizar_painel(n):
+def atualizar_painel(n, intervalo):
     """
-    Atualiza o dashboard a cada intervalo:
+    Atualiza o dashboard a cada intervalo (ou ao aplicar zoom no gráfico):
     - Atualiza relógio do coordenador
     - Atualiza cards de cada processo
-    - Atualiza o gráfico geral
+    - Atualiza o gráfico geral, com resolução total no trecho visível
     """
-    agora = time.time()
+    agora = relogio.agora()
+    atuais = obter_offsets_atuais()
     cards = []
     for pid in PROCESSOS:
-        offset = obter_offset(pid)
-        card = dbc.Col(construir_card(pid, agora, offset), width=4)
+        if pid in atuais:
+            offset, ultima_sync, status = atuais[pid]
+            card = construir_card(pid, agora, offset, status, ultima_sync)
+        else:
+            # Processos ainda não publicados na tabela são lidos do arquivo .txt
+            card = construir_card(pid, agora, obter_offset(pid))
+        card = dbc.Col(card, width=4)
         cards.append(card)
 
     return (
         f"Relógio do Coordenador: {formatar_horario(agora)}",
         cards,
-        gerar_grafico_geral(),
+        gerar_grafico_geral(intervalo),
     )
 
 
+@app.callback(
+    Output("intervalo-x", "data"),
+    Input("grafico-geral", "relayoutData"),
+    State("intervalo-x", "data"),
+    prevent_initial_call=True,
+)
+def registrar_zoom(relayout, atual):
+    """
+    Guarda o intervalo X com zoom entre eventos do gráfico; sem mudança, não dispara atualização.
+    """
+    novo = extrair_intervalo_x(relayout, atual)
+    return dash.no_update if novo == atual else novo
+
+
 # Reset da simulação
 @app.callback(
     Output("mensagem-reset", "children"),
@@ -281,7 +439,7 @@ def atualizar_painel(n):
 def resetar_simulacao(n):
     """
     Callback do botão de reset:
-    Remove arquivos .txt e .csv de offset dos processos
+    Remove arquivos .txt e .csv de offset dos processos e limpa a tabela compartilhada
     """
     count = 0
     for pid in PROCESSOS:
@@ -291,6 +449,10 @@ def resetar_simulacao(n):
                 count += 1
             except:
                 continue
+    if os.path.exists(tabela_offsets.CAMINHO_PADRAO):
+        tabela = tabela_offsets.TabelaOffsets(escrita=True)
+        tabela.limpar()
+        tabela.fechar()
     return f"✅ Simulação resetada ({count} arquivos apagados)."
 
 
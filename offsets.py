@@ -1,8 +1,236 @@
 # offsets.py
+import argparse
 import glob
+import math
+import os
+from datetime import datetime
+from multiprocessing import Pool
 
+import tabela_offsets
+
+"""
+Utilitário de inspeção dos offsets salvos localmente.
+Sem argumentos, lista o offset atual de cada processo (tabela compartilhada ou offset_*.txt).
+Com --analise, percorre os históricos offset_*.csv em uma única passada, com memória
+limitada por processo, e reporta métricas de convergência por processo e da frota.
+"""
+
+
+class HistogramaLog:
+    """
+    Histograma com buckets em escala logarítmica para estimar percentis de valores
+    absolutos com memória limitada (erro relativo de ~1% com o GAMMA padrão).
+    """
+
+    GAMMA = 1.02
+    MINIMO = 1e-9
+
+    def __init__(self):
+        self.baldes = {}
+        self.zeros = 0
+        self.total = 0
+        self._log_gamma = math.log(self.GAMMA)
+
+    def adicionar(self, valor: float):
+        self.total += 1
+        if valor < self.MINIMO:
+            self.zeros += 1
+            return
+        indice = math.ceil(math.log(valor) / self._log_gamma)
+        self.baldes[indice] = self.baldes.get(indice, 0) + 1
+
+    def mesclar(self, outro: "HistogramaLog"):
+        self.total += outro.total
+        self.zeros += outro.zeros
+        for indice, contagem in outro.baldes.items():
+            self.baldes[indice] = self.baldes.get(indice, 0) + contagem
+
+    def percentil(self, p: float) -> float:
+        if self.total == 0:
+            return math.nan
+        alvo = max(math.ceil(self.total * p / 100), 1)
+        acumulado = self.zeros
+        if acumulado >= alvo:
+            return 0.0
+        for indice in sorted(self.baldes):
+            acumulado += self.baldes[indice]
+            if acumulado >= alvo:
+                # Ponto médio (relativo) do bucket [gamma^(i-1), gamma^i]
+                return 2 * self.GAMMA**indice / (self.GAMMA + 1)
+        return 2 * self.GAMMA ** max(self.baldes) / (self.GAMMA + 1)
+
+
+def analisar_arquivo(tarefa):
+    """
+    Analisa o histórico 'offset_<pid>.csv' em uma única passada.
+
+    :param tarefa: Tupla (caminho do CSV, limiar em segundos).
+    :return: Dicionário com as métricas do processo, ou None se o arquivo for inválido.
+    - converge_em: ciclo a partir do qual todo ajuste ficou abaixo do limiar
+    - oscilacoes: inversões de sentido entre ajustes consecutivos acima do limiar
+    """
+    arquivo, limiar = tarefa
+    processo = os.path.basename(arquivo).replace("offset_", "").replace(".csv", "")
+    histograma = HistogramaLog()
+    amostras = 0
+    soma_abs = 0.0
+    max_abs = 0.0
+    anterior = None
+    sentido_anterior = 0
+    oscilacoes = 0
+    converge_em = None
+    primeiro_ciclo = None
+    offset = math.nan
+
+    try:
+        with open(arquivo, "r") as f:
+            next(f, None)  # cabeçalho
+            for linha in f:
+                ciclo_txt, _, valor_txt = linha.partition(",")
+                if not valor_txt:
+                    continue
+                ciclo = int(ciclo_txt)
+                offset = float(valor_txt)
+                if primeiro_ciclo is None:
+                    primeiro_ciclo = ciclo
+
+                absoluto = abs(offset)
+                amostras += 1
+                soma_abs += absoluto
+                if absoluto > max_abs:
+                    max_abs = absoluto
+                histograma.adicionar(absoluto)
+
+                if anterior is not None:
+                    ajuste = offset - anterior
+                    if abs(ajuste) >= limiar:
+                        converge_em = None
+                        sentido = 1 if ajuste > 0 else -1
+                        if sentido_anterior and sentido != sentido_anterior:
+                            oscilacoes += 1
+                        sentido_anterior = sentido
+                    elif converge_em is None:
+                        converge_em = ciclo
+                anterior = offset
+    except Exception as e:
+        print(f"Erro ao ler {arquivo}: {e}")
+        return None
+
+    if amostras == 0:
+        return None
+
+    return {
+        "processo": processo,
+        "amostras": amostras,
+        "primeiro_ciclo": primeiro_ciclo,
+        "converge_em": converge_em,
+        "final": offset,
+        "soma_abs": soma_abs,
+        "max_abs": max_abs,
+        "oscilacoes": oscilacoes,
+        "histograma": histograma,
+    }
+
+
+def formatar_convergencia(resultado):
+    """Descreve o ciclo de convergência e quantos ciclos foram necessários."""
+    if resultado["converge_em"] is None:
+        return "não convergiu"
+    ciclos = resultado["converge_em"] - resultado["primeiro_ciclo"]
+    return f"ciclo {resultado['converge_em']} ({ciclos} ciclos)"
+
+
+def imprimir_processo(r):
+    """Imprime as métricas de um histórico; o p99 estimado é limitado ao máximo exato."""
+    p99 = min(r["histograma"].percentil(99), r["max_abs"])
+    print(
+        f"{r['processo']}: {formatar_convergencia(r)} | final {r['final']:+.6f}s | "
+        f"média |off| {r['soma_abs'] / r['amostras']:.6f}s | "
+        f"p99 {p99:.6f}s | máx {r['max_abs']:.6f}s | "
+        f"oscilações {r['oscilacoes']}"
+    )
+
+
+def analisar(padrao: str, limiar: float, workers: int, somente_frota: bool):
+    """
+    Analisa todos os históricos que casam com `padrao`, distribuindo os arquivos entre
+    `workers` processos, e imprime as métricas por processo e agregadas da frota.
+    A frota é considerada convergida no último ciclo de convergência entre os processos;
+    históricos do coordenador são reportados à parte e não entram nos totais da frota.
+    """
+    arquivos = sorted(glob.glob(padrao))
+    if not arquivos:
+        print("Nenhum arquivo offset_*.csv encontrado.")
+        return
+
+    tarefas = [(arquivo, limiar) for arquivo in arquivos]
+    if workers > 1 and len(arquivos) > 1:
+        with Pool(workers) as pool:
+            chunksize = max(len(tarefas) // (workers * 4), 1)
+            resultados = list(pool.imap(analisar_arquivo, tarefas, chunksize))
+    else:
+        resultados = [analisar_arquivo(tarefa) for tarefa in tarefas]
+    resultados = [r for r in resultados if r is not None]
+    if not resultados:
+        print("Nenhum histórico válido encontrado.")
+        return
+
+    # Históricos do coordenador (offset_coordinator*.csv) não são processos da frota
+    coordenadores = [r for r in resultados if r["processo"].startswith("coordinator")]
+    resultados = [r for r in resultados if not r["processo"].startswith("coordinator")]
+
+    if not somente_frota:
+        print(f"Convergência por processo (limiar {limiar:g}s):")
+        for r in resultados:
+            imprimir_processo(r)
+        print()
+        if coordenadores:
+            print("Coordenador:")
+            for r in coordenadores:
+                imprimir_processo(r)
+            print()
+    if not resultados:
+        print("Nenhum histórico de processo encontrado.")
+        return
+
+    frota = HistogramaLog()
+    for r in resultados:
+        frota.mesclar(r["histograma"])
+
+    finais = [r["final"] for r in resultados]
+    amostras = sum(r["amostras"] for r in resultados)
+    max_frota = max(r["max_abs"] for r in resultados)
+    nao_convergidos = [r for r in resultados if r["converge_em"] is None]
+    print(f"Frota ({len(resultados)} processos, {amostras} amostras):")
+    if nao_convergidos:
+        print(f"  convergência: {len(nao_convergidos)} processo(s) não convergiram")
+    else:
+        print(f"  convergência: ciclo {max(r['converge_em'] for r in resultados)}")
+    print(f"  dispersão final: {max(finais) - min(finais):.6f}s")
+    print(f"  média |off|: {sum(r['soma_abs'] for r in resultados) / amostras:.6f}s")
+    print(f"  p99 |off|: {min(frota.percentil(99), max_frota):.6f}s")
+    print(f"  máx |off|: {max_frota:.6f}s")
+    print(f"  oscilações: {sum(r['oscilacoes'] for r in resultados)}")
+
+
+def listar():
+    """
+    Lista o offset atual de cada nó, lendo a tabela compartilhada (offsets.tbl) quando ela
+    existir e, caso contrário, os arquivos offset_*.txt.
+    """
+    tabela = tabela_offsets.abrir_leitura()
+    if tabela is not None:
+        atuais = tabela.ler_todos()
+        tabela.fechar()
+        if atuais:
+            print("Offsets atuais (tabela compartilhada):")
+            for pid in sorted(atuais):
+                offset, ultima_sync, status = atuais[pid]
+                quando = datetime.fromtimestamp(ultima_sync).strftime("%H:%M:%S")
+                nome_status = tabela_offsets.NOMES_STATUS.get(status, str(status))
+                print(f"{pid}: {offset:+.3f} segundos ({nome_status} às {quando})")
+            return
 
-def main():
     arquivos = glob.glob("offset_*.txt")
     if not arquivos:
         print("Nenhum offset salvo encontrado.")
@@ -18,5 +246,30 @@ def main():
             print(f"Erro ao ler {arquivo}: {e}")
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Inspeção dos offsets salvos")
+    parser.add_argument(
+        "--analise", action="store_true", help="Analisa a convergência dos históricos CSV"
+    )
+    parser.add_argument(
+        "--limiar", type=float, default=0.05, help="Limiar de convergência (s)"
+    )
+    parser.add_argument(
+        "--padrao", type=str, default="offset_*.csv", help="Glob dos históricos"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="Processos paralelos"
+    )
+    parser.add_argument(
+        "--somente-frota", action="store_true", help="Omite as métricas por processo"
+    )
+    args = parser.parse_args()
+
+    if args.analise:
+        analisar(args.padrao, args.limiar, args.workers, args.somente_frota)
+    else:
+        listar()
+
+
 if __name__ == "__main__":
     main()
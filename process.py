@@ -1,6 +1,8 @@
 import socket
 import argparse
-import time
+import relogio
+import tabela_offsets
+from profiling import RoundProfiler
 import os
 import csv
 from datetime import datetime
@@ -14,12 +16,13 @@ Do ponto de vista da literatura, representa o 'Slave'
 
 def get_simulated_time(offset):
     """
-    Retorna o horário atual simulado com o offset aplicado.
+    Retorna o horário atual simulado com o offset aplicado, segundo o relógio em uso
+    (real ou virtual, com a deriva do nó).
 
     :param offset: Deslocamento do relógio local em relação ao tempo real.
     :return: timestamp ajustado com o offset.
     """
-    return time.time() + offset
+    return relogio.agora() + offset
 
 
 def log(message):
@@ -50,7 +53,7 @@ def load_offset(process_id: str, base_offset: float) -> float:
 
 def persist_offset(process_id: str, offset: float):
     """
-    Salva o offset atual em arquivo local para uso em futuros ciclos.
+    Salva o offset atual em arquivo local para uso em futuros ciclos e o publica na tabela compartilhada.
     Função especificamente para demonstração didática (local)
 
     :param process_id: ID do processo.
@@ -61,6 +64,22 @@ def persist_offset(process_id: str, offset: float):
             f.write(f"{offset:+.3f}")
     except Exception as e:
         log(f"[Processo {process_id}] Erro ao salvar offset: {e}")
+    publish_offset(process_id, offset, tabela_offsets.STATUS_SINCRONIZADO)
+
+
+def publish_offset(process_id: str, offset: float, status: int):
+    """
+    Publica o offset e o status do processo na tabela compartilhada (offsets.tbl),
+    lida pelo dashboard e pelo offsets.py sem abrir um arquivo por processo.
+
+    :param process_id: ID do processo.
+    :param offset: Offset atual.
+    :param status: Status da última sincronização (tabela_offsets.STATUS_*).
+    """
+    try:
+        tabela_offsets.publicar(process_id, offset, status, relogio.agora())
+    except Exception as e:
+        log(f"[Processo {process_id}] Erro ao publicar offset na tabela: {e}")
 
 
 def get_next_cycle_number(process_id: str) -> int:
@@ -106,7 +125,7 @@ def append_cycle_csv(process_id: str, cycle: int, offset: float):
 def main():
     """
     Método principal do cliente:
-    - Conecta ao coordenador via socket TCP
+    - Conecta ao coordenador via socket TCP e informa seu grupo
     - Envia o horário local (simulado com offset)
     - Recebe o ajuste calculado e aplica ao seu offset
     - Salva o novo offset para uso futuro
@@ -120,19 +139,46 @@ def main():
     parser.add_argument(
         "--id", type=str, default="N/A", help="Identificador do processo"
     )
+    parser.add_argument(
+        "--group", type=str, default="default", help="Grupo de sincronização"
+    )
+    parser.add_argument(
+        "--deriva", type=float, default=0.0, help="Deriva do relógio local (ppm)"
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=str,
+        default=None,
+        help="Habilita o profiling do ciclo, gravando os resultados neste diretório",
+    )
+    parser.add_argument(
+        "--profile-every", type=int, default=1, help="Perfila 1 a cada N ciclos"
+    )
     args = parser.parse_args()
+    # A origem da deriva é persistida junto ao offset para acumular entre execuções
+    relogio.aplicar_deriva(args.deriva, f"offset_{args.id}.origem")
 
     current_offset = load_offset(args.id, args.offset)
     cycle = get_next_cycle_number(args.id)
+    profiler = RoundProfiler(args.profile_dir, args.profile_every, f"process-{args.id}")
+    profiler.start_round(cycle)
 
     try:
-        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        client_socket.connect((args.host, args.port))
+        with profiler.phase("connect"):
+            client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            client_socket.connect((args.host, args.port))
+
+            # Handshake: informa ao coordenador o grupo de sincronização
+            client_socket.sendall(f"JOIN {args.group}\n".encode())
+
+        with profiler.phase("wait_request"):
+            message = client_socket.recv(1024)
 
-        message = client_socket.recv(1024)
+        if message.decode() == "UNKNOWN_GROUP":
+            log(f"[Processo {args.id}] Grupo '{args.group}' recusado pelo coordenador.")
 
         # Se for a mensagem esperada, envia o horário local simulado
-        if message.decode() == "REQUEST_TIME":
+        elif message.decode() == "REQUEST_TIME":
             # Calcula o horário local atual com offset
             local_time = get_simulated_time(current_offset)
 
@@ -142,10 +188,12 @@ def main():
             )
 
             # Envia o horário local simulado ao coordenador
-            client_socket.sendall(str(local_time).encode())
+            with profiler.phase("send_time"):
+                client_socket.sendall(str(local_time).encode())
 
             # Aguarda o valor de ajuste do coordenador
-            response = client_socket.recv(1024).decode().strip()
+            with profiler.phase("wait_adjustment"):
+                response = client_socket.recv(1024).decode().strip()
             if response:
 
                 # Converte o valor recebido e atualiza o offset local
@@ -160,13 +208,15 @@ def main():
                 log(
                     f"[Processo {args.id}] Novo horário ajustado: {datetime.fromtimestamp(adjusted_time).strftime('%H:%M:%S')}"
                 )
-                # Persiste o novo offset em um arquivo .txt
-                persist_offset(args.id, current_offset)
-                # Registra o ciclo e o novo offset em um arquivo .csv
-                append_cycle_csv(args.id, cycle, current_offset)
+                with profiler.phase("persistence"):
+                    # Persiste o novo offset em um arquivo .txt
+                    persist_offset(args.id, current_offset)
+                    # Registra o ciclo e o novo offset em um arquivo .csv
+                    append_cycle_csv(args.id, cycle, current_offset)
             else:
                 # No caso de não haver recebido ajuste do coordenador
                 log(f"[Processo {args.id}] Nenhum ajuste recebido do coordenador.")
+                publish_offset(args.id, current_offset, tabela_offsets.STATUS_SEM_AJUSTE)
 
         # Após o processo ser realizado, fecha a conexão
         client_socket.shutdown(socket.SHUT_RDWR)
@@ -174,6 +224,8 @@ def main():
 
     except Exception as error:
         log(f"[Processo {args.id}] Erro na conexão ou execução: {error}")
+    finally:
+        profiler.end_round()
 
 
 if __name__ == "__main__":
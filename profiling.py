@@ -0,0 +1,183 @@
+import contextlib
+import cProfile
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+
+"""
+Ganchos de profiling por rodada para o coordenador e os processos (opt-in).
+Quando habilitado, a cada N rodadas grava em `directory`:
+
+- <nome>_r<rodada>.prof: estatísticas do cProfile apenas da thread que executa a rodada
+  (pstats/snakeviz); as threads por cliente do coordenador não são cobertas pelo cProfile.
+  Se o cProfile não puder ser ativado (Python 3.12+ com outra rodada já perfilada no processo),
+  grava <nome>_r<rodada>.prof.skipped com o motivo no lugar do .prof
+- <nome>_r<rodada>.tracemalloc: snapshot das alocações feitas durante a rodada (todas as threads)
+- <nome>_r<rodada>.folded: tempo de parede por fase no formato "folded stacks"
+  (flamegraph.pl, speedscope). Fases executadas em outras threads ficam sob a raiz própria
+  "<nome>;clients", com os tempos somados entre as threads, pois se sobrepõem às fases da rodada
+
+Desabilitado, `phase()` devolve sempre o mesmo contexto vazio, com custo desprezível.
+"""
+
+_NO_OP = contextlib.nullcontext()
+
+
+def log(msg):
+    """Imprime mensagem com timestamp formatado."""
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+# tracemalloc é global ao processo: rodadas perfiladas concorrentes (vários grupos) compartilham a coleta
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_started = False
+
+
+def _acquire_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_started
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_started = True
+        _tracemalloc_users += 1
+
+
+def _release_tracemalloc():
+    """Tira o snapshot da rodada e para a coleta quando nenhuma outra rodada a utiliza."""
+    global _tracemalloc_users, _tracemalloc_started
+    with _tracemalloc_lock:
+        snapshot = tracemalloc.take_snapshot()
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_started:
+            tracemalloc.stop()
+            _tracemalloc_started = False
+        return snapshot
+
+
+class _Phase:
+    """Mede o tempo de parede de uma fase e o registra no caminho da pilha de fases da thread."""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._stack().append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stack = self.profiler._stack()
+        self.profiler._record(tuple(stack), elapsed)
+        stack.pop()
+        return False
+
+
+class RoundProfiler:
+    """
+    Profiler de rodadas.
+
+    :param directory: Diretório de saída; None desabilita o profiling.
+    :param every: Perfila apenas rodadas múltiplas de `every`.
+    :param name: Prefixo dos arquivos e raiz das pilhas de fases.
+    """
+
+    def __init__(self, directory=None, every=1, name="coordinator"):
+        self.directory = directory
+        self.every = max(every, 1)
+        self.name = name
+        self.active = False
+        self.number = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._spans = defaultdict(float)
+        self._profile = None
+        self._skip_reason = None
+        self._start = 0.0
+        self._thread = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def start_round(self, number: int):
+        """Inicia a coleta se a rodada `number` deve ser perfilada."""
+        self.active = bool(self.directory) and number % self.every == 0
+        if not self.active:
+            return
+        self.number = number
+        self._thread = threading.get_ident()
+        self._spans = defaultdict(float)
+        _acquire_tracemalloc()
+        self._profile = cProfile.Profile()
+        self._skip_reason = None
+        try:
+            self._profile.enable()
+        except ValueError as e:
+            # Python 3.12+: só um cProfile ativo por vez (ex.: outro grupo já está sendo perfilado)
+            self._profile = None
+            self._skip_reason = str(e)
+            log(f"[Profiling] {self.name} rodada {number}: cProfile não ativado ({e}); .prof omitido")
+        self._start = time.perf_counter()
+
+    def phase(self, name: str):
+        """Contexto que mede a fase `name` da rodada atual (sem efeito se inativo)."""
+        if not self.active:
+            return _NO_OP
+        return _Phase(self, name)
+
+    def end_round(self):
+        """Encerra a coleta da rodada e grava os arquivos de saída."""
+        if not self.active:
+            return
+        total = time.perf_counter() - self._start
+        if self._profile is not None:
+            self._profile.disable()
+        snapshot = _release_tracemalloc()
+        self.active = False
+
+        base = os.path.join(self.directory, f"{self.name}_r{self.number:06d}")
+        if self._profile is not None:
+            self._profile.dump_stats(base + ".prof")
+        else:
+            with open(base + ".prof.skipped", "w") as f:
+                f.write(f"cProfile não ativado: {self._skip_reason}\n")
+        snapshot.dump(base + ".tracemalloc")
+        with open(base + ".folded", "w") as f:
+            for path, micros in self._folded(total):
+                f.write(f"{';'.join(path)} {micros}\n")
+        self._profile = None
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            if threading.get_ident() == self._thread:
+                stack = self._local.stack = [self.name]
+            else:
+                stack = self._local.stack = [self.name, "clients"]
+        return stack
+
+    def _record(self, path, elapsed):
+        with self._lock:
+            self._spans[path] += elapsed
+
+    def _folded(self, total):
+        """
+        Converte os tempos totais por caminho em tempos próprios (descontando as subfases),
+        em microssegundos, como esperado pelo formato folded.
+        A raiz "clients" não tem tempo próprio e não é descontada da raiz da rodada.
+        """
+        with self._lock:
+            spans = dict(self._spans)
+        spans[(self.name,)] = total
+        children = defaultdict(float)
+        for path, elapsed in spans.items():
+            if len(path) > 1:
+                children[path[:-1]] += elapsed
+        for path in sorted(spans):
+            own = max(spans[path] - children[path], 0.0)
+            yield path, int(own * 1e6)
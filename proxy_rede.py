@@ -0,0 +1,348 @@
+import argparse
+import heapq
+import itertools
+import queue
+import random
+import socket
+import threading
+import time
+from datetime import datetime
+
+"""
+Proxy local de degradação de rede para avaliar o algoritmo de Berkeley sem redes reais.
+Fica entre process.py e coordinator.py e injeta, em cada sentido, latência, jitter,
+perda e limite de banda. Permite reproduzir em loopback o atraso assimétrico que quebra
+a suposição de RTT/2 usada pelo coordenador.
+
+- "ida": cliente -> coordenador
+- "volta": coordenador -> cliente
+
+Em TCP a perda não pode descartar bytes do fluxo; cada segmento "perdido" é entregue com
+um atraso extra de PENALIDADE_PERDA, como uma retransmissão. Em UDP o datagrama é descartado.
+"""
+
+# Atraso extra (s) aplicado a um segmento TCP "perdido", simulando a retransmissão
+PENALIDADE_PERDA = 0.2
+
+# Tempo (s) sem tráfego após o qual o socket UDP de um cliente para o coordenador é fechado
+OCIOSIDADE_UDP = 30.0
+
+
+def log(msg):
+    """Imprime mensagem com timestamp formatado."""
+    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+
+
+class PerfilDirecao:
+    """
+    Degradação aplicada a um sentido do enlace.
+
+    :param latencia: Atraso fixo em segundos.
+    :param jitter: Variação uniforme máxima (±) em segundos somada à latência.
+    :param perda: Probabilidade (0-1) de perda de cada segmento/datagrama.
+    :param banda: Limite de banda em bytes/s (None = ilimitado).
+    """
+
+    def __init__(self, latencia=0.0, jitter=0.0, perda=0.0, banda=None):
+        self.latencia = latencia
+        self.jitter = jitter
+        self.perda = perda
+        self.banda = banda
+
+    def __repr__(self):
+        return (
+            f"PerfilDirecao(latencia={self.latencia}, jitter={self.jitter}, "
+            f"perda={self.perda}, banda={self.banda})"
+        )
+
+
+# Perfis prontos: nome -> (ida, volta)
+PERFIS = {
+    "loopback": (PerfilDirecao(), PerfilDirecao()),
+    "lan": (PerfilDirecao(0.001, 0.0005), PerfilDirecao(0.001, 0.0005)),
+    "assimetrico": (PerfilDirecao(0.005), PerfilDirecao(0.050)),
+    "jitter": (PerfilDirecao(0.020, 0.015), PerfilDirecao(0.020, 0.015)),
+    "perda": (PerfilDirecao(0.010, perda=0.1), PerfilDirecao(0.010, perda=0.1)),
+    "banda": (PerfilDirecao(0.002, banda=2000), PerfilDirecao(0.002, banda=2000)),
+}
+
+
+class Enlace:
+    """
+    Estado de um sentido do enlace: calcula o instante de entrega de cada segmento
+    considerando serialização (banda), latência, jitter e perda.
+    """
+
+    def __init__(self, perfil: PerfilDirecao, ordenado: bool):
+        self.perfil = perfil
+        self.ordenado = ordenado  # TCP preserva a ordem de entrega; UDP pode reordenar
+        self.livre_em = 0.0
+        self.ultima_entrega = 0.0
+        self.lock = threading.Lock()
+
+    def agendar(self, tamanho: int):
+        """
+        :param tamanho: Tamanho do segmento em bytes.
+        :return: Instante (time.monotonic) de entrega, ou None se o segmento foi descartado.
+        """
+        p = self.perfil
+        perdido = p.perda > 0 and random.random() < p.perda
+        if perdido and not self.ordenado:
+            return None
+
+        with self.lock:
+            agora = time.monotonic()
+            inicio = max(agora, self.livre_em)
+            self.livre_em = inicio + (tamanho / p.banda if p.banda else 0.0)
+            entrega = self.livre_em + p.latencia
+            if p.jitter:
+                entrega += random.uniform(-p.jitter, p.jitter)
+            if perdido:
+                entrega += PENALIDADE_PERDA
+            entrega = max(entrega, self.livre_em)
+            if self.ordenado:
+                entrega = max(entrega, self.ultima_entrega)
+                self.ultima_entrega = entrega
+            return entrega
+
+
+class ProxyImpairment:
+    """
+    Proxy TCP ou UDP com degradação configurável por sentido.
+
+    :param escuta: (host, porta) local do proxy; porta 0 escolhe uma porta livre.
+    :param destino: (host, porta) do coordenador.
+    :param ida: Perfil cliente -> coordenador.
+    :param volta: Perfil coordenador -> cliente.
+    :param protocolo: "tcp" ou "udp".
+    :param ociosidade: Em UDP, segundos sem tráfego até liberar o socket de um cliente.
+    """
+
+    def __init__(
+        self, escuta, destino, ida=None, volta=None, protocolo="tcp", ociosidade=OCIOSIDADE_UDP
+    ):
+        self.escuta = escuta
+        self.destino = destino
+        self.ida = ida or PerfilDirecao()
+        self.volta = volta or PerfilDirecao()
+        self.protocolo = protocolo
+        self.ociosidade = ociosidade
+        self.parado = threading.Event()
+        self.sock = None
+        self.porta = None
+        self.upstreams = {}  # UDP: endereço do cliente -> [socket para o coordenador, última atividade]
+        self.upstreams_lock = threading.Lock()
+
+    def iniciar(self) -> int:
+        """Inicia o proxy em threads daemon e retorna a porta local em uso."""
+        tipo = socket.SOCK_STREAM if self.protocolo == "tcp" else socket.SOCK_DGRAM
+        self.sock = socket.socket(socket.AF_INET, tipo)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(self.escuta)
+        self.sock.settimeout(0.5)
+        self.porta = self.sock.getsockname()[1]
+        alvo = self._aceitar_tcp if self.protocolo == "tcp" else self._encaminhar_udp
+        threading.Thread(target=alvo, daemon=True).start()
+        return self.porta
+
+    def parar(self):
+        self.parado.set()
+        if self.sock is not None:
+            self.sock.close()
+        with self.upstreams_lock:
+            upstreams = [upstream for upstream, _ in self.upstreams.values()]
+            self.upstreams.clear()
+        for upstream in upstreams:
+            upstream.close()
+
+    # --- TCP ---
+
+    def _aceitar_tcp(self):
+        self.sock.listen()
+        while not self.parado.is_set():
+            try:
+                cliente, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            # A conexão ao coordenador pode bloquear; é feita fora do laço de accept
+            threading.Thread(target=self._conectar_tcp, args=(cliente,), daemon=True).start()
+
+    def _conectar_tcp(self, cliente):
+        """Conecta ao coordenador e inicia os dois sentidos da conexão do cliente."""
+        try:
+            servidor = socket.create_connection(self.destino)
+        except OSError as e:
+            log(f"[Proxy] Falha ao conectar em {self.destino}: {e}")
+            cliente.close()
+            return
+        restantes = [2]  # sentidos ainda abertos; o último a terminar fecha os sockets
+        lock = threading.Lock()
+        for origem, dest, perfil in (
+            (cliente, servidor, self.ida),
+            (servidor, cliente, self.volta),
+        ):
+            self._sentido_tcp(origem, dest, Enlace(perfil, ordenado=True), restantes, lock)
+
+    def _sentido_tcp(self, origem, dest, enlace, restantes, lock):
+        """Cria o par leitor/escritor de um sentido de uma conexão TCP."""
+        fila = queue.Queue()
+
+        def ler():
+            while True:
+                try:
+                    dados = origem.recv(65536)
+                except OSError:
+                    dados = b""
+                fila.put((enlace.agendar(len(dados)) if dados else enlace.ultima_entrega, dados))
+                if not dados:
+                    return
+
+        def escrever():
+            try:
+                while True:
+                    entrega, dados = fila.get()
+                    espera = entrega - time.monotonic()
+                    if espera > 0:
+                        time.sleep(espera)
+                    if not dados:
+                        dest.shutdown(socket.SHUT_WR)  # propaga o fim do fluxo
+                        break
+                    dest.sendall(dados)
+            except OSError:
+                pass
+            finally:
+                with lock:
+                    restantes[0] -= 1
+                    fim = restantes[0] == 0
+                if fim:
+                    origem.close()
+                    dest.close()
+
+        threading.Thread(target=ler, daemon=True).start()
+        threading.Thread(target=escrever, daemon=True).start()
+
+    # --- UDP ---
+
+    def _encaminhar_udp(self):
+        agenda = []  # heap de (entrega, seq, socket, dados, endereço)
+        seq = itertools.count()
+        cond = threading.Condition()
+        ida = Enlace(self.ida, ordenado=False)
+        volta = Enlace(self.volta, ordenado=False)
+
+        def agendar(enlace, sock, dados, endereco):
+            entrega = enlace.agendar(len(dados))
+            if entrega is None:
+                return
+            with cond:
+                heapq.heappush(agenda, (entrega, next(seq), sock, dados, endereco))
+                cond.notify()
+
+        def entregar():
+            while not self.parado.is_set():
+                with cond:
+                    while not agenda:
+                        cond.wait(0.5)
+                        if self.parado.is_set():
+                            return
+                    espera = agenda[0][0] - time.monotonic()
+                    if espera > 0:
+                        cond.wait(espera)
+                        continue
+                    _, _, sock, dados, endereco = heapq.heappop(agenda)
+                try:
+                    sock.sendto(dados, endereco)
+                except OSError:
+                    pass
+
+        def respostas(upstream, cliente):
+            while not self.parado.is_set():
+                try:
+                    dados = upstream.recv(65536)
+                except socket.timeout:
+                    # Libera o socket do cliente após `ociosidade` segundos sem tráfego
+                    with self.upstreams_lock:
+                        entrada = self.upstreams.get(cliente)
+                        if entrada is None or entrada[0] is not upstream:
+                            return
+                        if time.monotonic() - entrada[1] < self.ociosidade:
+                            continue
+                        del self.upstreams[cliente]
+                    upstream.close()
+                    return
+                except OSError:
+                    return
+                with self.upstreams_lock:
+                    entrada = self.upstreams.get(cliente)
+                    if entrada is not None:
+                        entrada[1] = time.monotonic()
+                agendar(volta, self.sock, dados, cliente)
+
+        threading.Thread(target=entregar, daemon=True).start()
+        while not self.parado.is_set():
+            try:
+                dados, cliente = self.sock.recvfrom(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            with self.upstreams_lock:
+                entrada = self.upstreams.get(cliente)
+                if entrada is None:
+                    upstream = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                    upstream.settimeout(0.5)
+                    entrada = self.upstreams[cliente] = [upstream, 0.0]
+                    threading.Thread(
+                        target=respostas, args=(upstream, cliente), daemon=True
+                    ).start()
+                entrada[1] = time.monotonic()
+            agendar(ida, entrada[0], dados, self.destino)
+
+
+def parse_endereco(texto: str):
+    """Converte 'host:porta' em (host, porta)."""
+    host, _, porta = texto.rpartition(":")
+    return host or "127.0.0.1", int(porta)
+
+
+def main():
+    """
+    Executa o proxy pela linha de comando, com um perfil pronto (--perfil) ou com
+    os parâmetros de cada sentido informados individualmente.
+    """
+    parser = argparse.ArgumentParser(description="Proxy de degradação de rede")
+    parser.add_argument("--listen", type=parse_endereco, default=("127.0.0.1", 6000))
+    parser.add_argument("--target", type=parse_endereco, default=("127.0.0.1", 5000))
+    parser.add_argument("--protocolo", choices=["tcp", "udp"], default="tcp")
+    parser.add_argument("--perfil", choices=sorted(PERFIS), default=None)
+    for sentido in ("ida", "volta"):
+        parser.add_argument(f"--latencia-{sentido}", type=float, default=0.0, help="s")
+        parser.add_argument(f"--jitter-{sentido}", type=float, default=0.0, help="s")
+        parser.add_argument(f"--perda-{sentido}", type=float, default=0.0, help="0-1")
+        parser.add_argument(f"--banda-{sentido}", type=float, default=None, help="bytes/s")
+    args = parser.parse_args()
+
+    if args.perfil:
+        ida, volta = PERFIS[args.perfil]
+    else:
+        ida = PerfilDirecao(args.latencia_ida, args.jitter_ida, args.perda_ida, args.banda_ida)
+        volta = PerfilDirecao(
+            args.latencia_volta, args.jitter_volta, args.perda_volta, args.banda_volta
+        )
+
+    proxy = ProxyImpairment(args.listen, args.target, ida, volta, args.protocolo)
+    porta = proxy.iniciar()
+    log(f"[Proxy] {args.protocolo.upper()} {args.listen[0]}:{porta} -> {args.target[0]}:{args.target[1]}")
+    log(f"[Proxy] ida: {ida}")
+    log(f"[Proxy] volta: {volta}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        proxy.parar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import os
+import time
+
+"""
+Fonte de relógio injetável usada pelo coordenador, pelos processos, pelo dashboard e pelo ciclos_sync.
+Permite executar o código real (com rede real) sob um relógio virtual que salta os períodos ociosos
+e com deriva por nó, de forma que cenários longos de deriva rodem em segundos.
+
+O relógio do processo é escolhido pela variável de ambiente BERKELEY_RELOGIO, herdada pelos subprocessos:
+- "real" (padrão) ou "real:<origem>"
+- "virtual:<deslocamento>" ou "virtual:<deslocamento>:<origem>": tempo real somado a <deslocamento>
+  segundos já saltados, com a deriva acumulada a partir de <origem> (timestamp). Trocas de rede,
+  inicialização e jitter correm em velocidade real; apenas as esperas (dormir) são comprimidas.
+  Processos com a mesma especificação compartilham o mesmo tempo.
+
+Sem <origem> na especificação, a deriva de um nó (aplicar_deriva) é acumulada a partir de uma origem
+persistida em arquivo pelo próprio nó, de forma que execuções sucessivas de um processo de curta
+duração (process.py, coordinator.py) continuem divergindo em vez de recomeçar do zero.
+"""
+
+VARIAVEL_AMBIENTE = "BERKELEY_RELOGIO"
+
+
+class RelogioReal:
+    """Relógio de parede do sistema. `origem` é a referência usada para acumular deriva."""
+
+    def __init__(self, origem=None):
+        self.origem = time.time() if origem is None else origem
+        self.origem_definida = origem is not None
+
+    def agora(self) -> float:
+        return time.time()
+
+    def dormir(self, segundos: float):
+        time.sleep(segundos)
+
+    def especificacao(self) -> str:
+        return f"real:{self.origem!r}"
+
+
+class RelogioVirtual:
+    """
+    Relógio que avança na velocidade real, somado a um deslocamento virtual.
+    Esperas (dormir) não bloqueiam: apenas avançam o deslocamento, saltando o período ocioso.
+    """
+
+    def __init__(self, deslocamento: float = 0.0, origem=None):
+        if deslocamento < 0:
+            raise ValueError("O deslocamento do relógio virtual não pode ser negativo")
+        self.deslocamento = deslocamento
+        # Origem padrão no tempo virtual atual: o deslocamento já saltado não conta como deriva
+        self.origem = time.time() + deslocamento if origem is None else origem
+        self.origem_definida = origem is not None
+
+    def agora(self) -> float:
+        return time.time() + self.deslocamento
+
+    def dormir(self, segundos: float):
+        self.deslocamento += max(segundos, 0.0)
+
+    def especificacao(self) -> str:
+        return f"virtual:{self.deslocamento!r}:{self.origem!r}"
+
+
+class RelogioComDeriva:
+    """
+    Envolve outro relógio aplicando deriva constante em partes por milhão, acumulada desde
+    `origem` (padrão: a origem do relógio base); ex.: 50 ppm = 0,18 s por hora.
+    """
+
+    def __init__(self, base, ppm: float, origem=None):
+        self.base = base
+        self.ppm = ppm
+        self.origem = base.origem if origem is None else origem
+
+    def agora(self) -> float:
+        t = self.base.agora()
+        return t + (t - self.origem) * self.ppm * 1e-6
+
+    def dormir(self, segundos: float):
+        self.base.dormir(segundos)
+
+    def especificacao(self) -> str:
+        # A deriva é local ao nó e não é herdada pelos subprocessos
+        return self.base.especificacao()
+
+
+def criar_relogio(especificacao: str):
+    """
+    Cria um relógio a partir da especificação textual (ver docstring do módulo).
+
+    :param especificacao: "real", "real:<origem>", "virtual:<deslocamento>" ou
+                          "virtual:<deslocamento>:<origem>".
+    :return: Instância de RelogioReal ou RelogioVirtual.
+    """
+    partes = especificacao.strip().split(":")
+    tipo = partes[0]
+    if tipo == "real" and len(partes) <= 2:
+        return RelogioReal(float(partes[1]) if len(partes) == 2 else None)
+    if tipo == "virtual" and len(partes) in (2, 3):
+        origem = float(partes[2]) if len(partes) == 3 else None
+        return RelogioVirtual(float(partes[1]), origem)
+    raise ValueError(f"Especificação de relógio inválida: '{especificacao}'")
+
+
+_relogio = criar_relogio(os.environ.get(VARIAVEL_AMBIENTE, "real"))
+
+
+def obter_relogio():
+    """Retorna o relógio em uso no processo."""
+    return _relogio
+
+
+def definir_relogio(relogio):
+    """Substitui o relógio em uso no processo (ex.: para aplicar deriva ao nó)."""
+    global _relogio
+    _relogio = relogio
+
+
+def carregar_origem(caminho: str, padrao: float) -> float:
+    """
+    Lê a origem de deriva persistida em `caminho`; se ela não existir (ou for inválida),
+    grava `padrao` e o retorna.
+    """
+    try:
+        with open(caminho, "r") as f:
+            return float(f.read().strip())
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(caminho, "w") as f:
+            f.write(repr(padrao))
+    except OSError:
+        pass
+    return padrao
+
+
+def aplicar_deriva(ppm: float, arquivo_origem=None):
+    """
+    Aplica deriva de `ppm` partes por milhão ao relógio do processo (0 = sem deriva).
+
+    :param ppm: Deriva em partes por milhão.
+    :param arquivo_origem: Arquivo onde persistir a origem da deriva entre execuções, usado
+                           quando a especificação do relógio não define a origem.
+    """
+    if ppm:
+        base = obter_relogio()
+        origem = None
+        if arquivo_origem and not base.origem_definida:
+            origem = carregar_origem(arquivo_origem, base.agora())
+        definir_relogio(RelogioComDeriva(base, ppm, origem))
+
+
+def agora() -> float:
+    """Timestamp atual segundo o relógio em uso."""
+    return _relogio.agora()
+
+
+def dormir(segundos: float):
+    """Espera `segundos` segundos segundo o relógio em uso."""
+    _relogio.dormir(segundos)
@@ -0,0 +1,214 @@
+import argparse
+import glob
+import math
+import os
+import statistics
+from multiprocessing import Pool
+
+from coordinator import estimate_offset, mean_offset, remove_outliers
+from round_trace import read_rounds, round_offsets
+
+"""
+Reexecução offline de traces de rodadas gravados pelo coordenador (--trace-dir).
+Recalcula os offsets a partir de t0, t2 e client_time e os passa pelo mesmo pipeline
+de outliers/média do coordenador, ou por estratégias alternativas, comparando os resultados
+sem precisar repetir rodadas reais.
+Traces grandes são divididos em faixas de rodadas, reexecutadas em paralelo.
+"""
+
+# Mínimo de rodadas por tarefa ao dividir um trace entre os processos
+RODADAS_POR_TAREFA = 1000
+
+
+def _sem_log(msg):
+    pass
+
+
+def berkeley(offsets):
+    """Pipeline do coordenador: remove outliers (1 desvio padrão) e calcula a média."""
+    pares = list(enumerate(offsets))
+    filtered = remove_outliers(pares, _sem_log)
+    if not filtered:
+        return math.nan, [True] * len(offsets)
+    kept = {i for i, _ in filtered}
+    return mean_offset(filtered), [i not in kept for i in range(len(offsets))]
+
+
+def media(offsets):
+    """Média simples dos clientes e do coordenador, sem remoção de outliers."""
+    return statistics.fmean(offsets + [0.0]), [False] * len(offsets)
+
+
+def mediana(offsets):
+    """Mediana dos clientes e do coordenador, sem remoção de outliers."""
+    return statistics.median(offsets + [0.0]), [False] * len(offsets)
+
+
+def media_aparada(offsets, corte=0.1):
+    """Média descartando a fração `corte` de cada extremo (clientes + coordenador)."""
+    valores = sorted(offsets + [0.0])
+    k = int(len(valores) * corte)
+    mantidos = valores[k : len(valores) - k] if k else valores
+    baixo, alto = mantidos[0], mantidos[-1]
+    return statistics.fmean(mantidos), [not (baixo <= o <= alto) for o in offsets]
+
+
+# Estratégias de agregação disponíveis: offsets -> (offset médio, flags de outlier)
+ESTRATEGIAS = {
+    "berkeley": berkeley,
+    "media": media,
+    "mediana": mediana,
+    "aparada": media_aparada,
+}
+
+
+def dividir_trace(caminho, partes):
+    """
+    Divide um trace em até `partes` faixas contíguas de rodadas, com ao menos
+    RODADAS_POR_TAREFA rodadas cada, a partir de uma única varredura dos cabeçalhos.
+
+    :return: Lista de (início, fim) em bytes, alinhados a limites de rodada.
+    """
+    inicios, fim = round_offsets(caminho)
+    if not inicios:
+        return []
+    passo = max(math.ceil(len(inicios) / max(partes, 1)), RODADAS_POR_TAREFA)
+    faixas = []
+    for i in range(0, len(inicios), passo):
+        proximo = inicios[i + passo] if i + passo < len(inicios) else fim
+        faixas.append((inicios[i], proximo))
+    return faixas
+
+
+def divergencia(gravado, calculado):
+    """Diferença absoluta entre valores gravado e recalculado; infinita se só um deles for NaN."""
+    if math.isnan(gravado) != math.isnan(calculado):
+        return math.inf
+    if math.isnan(gravado):
+        return 0.0
+    return abs(gravado - calculado)
+
+
+def reexecutar_faixa(tarefa):
+    """
+    Reexecuta as rodadas de uma faixa do trace para as estratégias pedidas.
+
+    :param tarefa: Tupla (caminho do trace, início, fim, lista de nomes de estratégias).
+    :return: Dicionário estratégia -> métricas acumuladas, mais a divergência em relação
+             ao que foi gravado (offset médio e ajustes; apenas para 'berkeley').
+    """
+    caminho, inicio, fim, nomes = tarefa
+    metricas = {
+        nome: {
+            "rodadas": 0,
+            "descartadas": 0,
+            "clientes": 0,
+            "outliers": 0,
+            "soma_abs_media": 0.0,
+            "soma_dispersao": 0.0,
+            "max_divergencia": 0.0,
+        }
+        for nome in nomes
+    }
+
+    for _, media_gravada, clientes in read_rounds(caminho, inicio, fim):
+        offsets = [estimate_offset(t0, t2, ct) for t0, t2, ct, _, _, _ in clientes]
+        for nome in nomes:
+            m = metricas[nome]
+            m["rodadas"] += 1
+            m["clientes"] += len(offsets)
+            media_calc, outliers = ESTRATEGIAS[nome](offsets)
+            m["outliers"] += sum(outliers)
+            if nome == "berkeley":
+                # Inclui rodadas gravadas como descartadas (média NaN)
+                m["max_divergencia"] = max(
+                    m["max_divergencia"], divergencia(media_gravada, media_calc)
+                )
+            if math.isnan(media_calc):
+                m["descartadas"] += 1
+                continue
+            m["soma_abs_media"] += abs(media_calc)
+
+            # Offsets após o ajuste: quem foi ajustado vai para a média, outliers ficam como estavam
+            finais = [o if out else media_calc for o, out in zip(offsets, outliers)]
+            finais.append(media_calc)  # coordenador
+            m["soma_dispersao"] += max(finais) - min(finais)
+
+            if nome == "berkeley":
+                for o, out, registro in zip(offsets, outliers, clientes):
+                    calculado = math.nan if out else media_calc - o
+                    m["max_divergencia"] = max(
+                        m["max_divergencia"], divergencia(registro[5], calculado)
+                    )
+    return metricas
+
+
+def main():
+    """
+    Reexecuta os traces informados (arquivos ou diretórios com trace_*.bin) em paralelo,
+    por faixas de rodadas, e imprime, por estratégia, as métricas agregadas de todas as rodadas.
+    """
+    parser = argparse.ArgumentParser(description="Replay offline de traces de rodadas")
+    parser.add_argument("traces", nargs="+", help="Arquivos .bin ou diretórios de traces")
+    parser.add_argument(
+        "--estrategia",
+        choices=sorted(ESTRATEGIAS),
+        action="append",
+        help="Estratégia de agregação (repetível; padrão: todas)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="Processos paralelos"
+    )
+    args = parser.parse_args()
+
+    arquivos = []
+    for caminho in args.traces:
+        if os.path.isdir(caminho):
+            arquivos.extend(sorted(glob.glob(os.path.join(caminho, "trace_*.bin"))))
+        else:
+            arquivos.append(caminho)
+    if not arquivos:
+        print("Nenhum trace encontrado.")
+        return
+
+    nomes = args.estrategia or list(ESTRATEGIAS)
+    tarefas = [
+        (arquivo, inicio, fim, nomes)
+        for arquivo in arquivos
+        for inicio, fim in dividir_trace(arquivo, args.workers * 4)
+    ]
+    if not tarefas:
+        print("Nenhuma rodada completa nos traces informados.")
+        return
+    if args.workers > 1 and len(tarefas) > 1:
+        with Pool(args.workers) as pool:
+            parciais = pool.map(reexecutar_faixa, tarefas)
+    else:
+        parciais = [reexecutar_faixa(tarefa) for tarefa in tarefas]
+
+    print(f"Replay de {len(arquivos)} trace(s):")
+    for nome in nomes:
+        total = {chave: 0 for chave in parciais[0][nome]}
+        for parcial in parciais:
+            for chave, valor in parcial[nome].items():
+                if chave == "max_divergencia":
+                    total[chave] = max(total[chave], valor)
+                else:
+                    total[chave] += valor
+        aplicadas = total["rodadas"] - total["descartadas"]
+        linha = (
+            f"{nome}: {total['rodadas']} rodadas ({total['descartadas']} descartadas) | "
+            f"outliers {total['outliers']}/{total['clientes']}"
+        )
+        if aplicadas:
+            linha += (
+                f" | |média| {total['soma_abs_media'] / aplicadas:.6f}s"
+                f" | dispersão pós-ajuste {total['soma_dispersao'] / aplicadas:.6f}s"
+            )
+        if nome == "berkeley":
+            linha += f" | divergência do gravado {total['max_divergencia']:.2e}s"
+        print(linha)
+
+
+if __name__ == "__main__":
+    main()
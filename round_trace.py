@@ -0,0 +1,107 @@
+import mmap
+import os
+import struct
+import threading
+
+"""
+Formato binário compacto para traces das rodadas do coordenador de Berkeley.
+O arquivo começa com MAGIC e segue com rodadas, cada uma com um cabeçalho ROUND
+seguido de `clientes` registros CLIENT, todos little-endian e sem padding:
+
+- ROUND:  timestamp da rodada, nº de clientes, offset médio (NaN se a rodada foi descartada)
+- CLIENT: t0, t2, client_time, RTT, outlier (0/1), ajuste enviado (NaN se outlier)
+"""
+
+MAGIC = b"BKTR\x01"
+ROUND = struct.Struct("<dId")
+CLIENT = struct.Struct("<ddddBd")
+
+
+class TraceWriter:
+    """
+    Grava rodadas em um arquivo de trace (modo append), de forma segura entre threads.
+    Cada rodada é escrita com uma única chamada de write.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        new_file = not os.path.isfile(path) or os.path.getsize(path) == 0
+        self.file = open(path, "ab")
+        if new_file:
+            self.file.write(MAGIC)
+            self.file.flush()
+
+    def write_round(self, timestamp: float, mean: float, clients):
+        """
+        :param timestamp: Início da rodada.
+        :param mean: Offset médio aplicado (NaN se nenhum ajuste foi enviado).
+        :param clients: Lista de (t0, t2, client_time, rtt, outlier, ajuste).
+        """
+        data = bytearray(ROUND.pack(timestamp, len(clients), mean))
+        for t0, t2, client_time, rtt, outlier, adjustment in clients:
+            data += CLIENT.pack(t0, t2, client_time, rtt, 1 if outlier else 0, adjustment)
+        with self.lock:
+            self.file.write(data)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def round_offsets(path: str):
+    """
+    Percorre apenas os cabeçalhos ROUND do trace, saltando os registros CLIENT, para
+    localizar o início de cada rodada completa (ex.: dividir o trace entre processos).
+
+    :param path: Caminho do arquivo de trace.
+    :return: Tupla (posições de início das rodadas, posição final da última rodada completa).
+    """
+    offsets = []
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= len(MAGIC):
+            return offsets, len(MAGIC)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[: len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} não é um trace de rodadas válido")
+            pos = len(MAGIC)
+            end = len(mm)
+            while pos + ROUND.size <= end:
+                _, count, _ = ROUND.unpack_from(mm, pos)
+                next_pos = pos + ROUND.size + count * CLIENT.size
+                if next_pos > end:
+                    break  # rodada truncada
+                offsets.append(pos)
+                pos = next_pos
+    return offsets, pos
+
+
+def read_rounds(path: str, start=None, stop=None):
+    """
+    Lê as rodadas de um trace sem copiar o arquivo para a memória (mmap).
+
+    :param path: Caminho do arquivo de trace.
+    :param start: Posição (em bytes) da primeira rodada a ler; padrão: início do trace.
+    :param stop: Posição (em bytes) onde a leitura termina; padrão: fim do arquivo.
+                 Ambas devem vir de round_offsets() para cair em limites de rodada.
+    :return: Gerador de (timestamp, offset médio, lista de registros CLIENT).
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= len(MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[: len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} não é um trace de rodadas válido")
+            pos = len(MAGIC) if start is None else start
+            end = len(mm) if stop is None else min(stop, len(mm))
+            while pos + ROUND.size <= end:
+                timestamp, count, mean = ROUND.unpack_from(mm, pos)
+                pos += ROUND.size
+                if pos + count * CLIENT.size > end:
+                    break  # rodada truncada (coordenador interrompido durante a escrita)
+                clients = []
+                for _ in range(count):
+                    clients.append(CLIENT.unpack_from(mm, pos))
+                    pos += CLIENT.size
+                yield timestamp, mean, clients
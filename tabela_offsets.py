@@ -0,0 +1,217 @@
+import mmap
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+"""
+Tabela compartilhada (arquivo mapeado em memória) com o offset atual de cada nó.
+Coordenador e processos publicam nela a cada sincronização; leitores locais (dashboard,
+offsets.py) leem todos os offsets de uma vez, sem abrir um arquivo por processo.
+
+Layout (little-endian): cabeçalho HEADER seguido de `capacidade` registros RECORD de 64 bytes.
+Cada registro usa um seqlock: o escritor torna `seq` ímpar, grava os campos e torna `seq` par
+novamente; o leitor repete a leitura enquanto `seq` estiver ímpar ou mudar durante a cópia.
+Escritores são serializados por lock no arquivo (entre processos) e por um threading.Lock
+(entre threads do mesmo processo, que compartilham o descritor); leitores nunca bloqueiam.
+"""
+
+CAMINHO_PADRAO = "offsets.tbl"
+CAPACIDADE_PADRAO = 4096
+
+MAGIC = b"BKOFFTBL"
+VERSAO = 1
+HEADER = struct.Struct("<8sII16x")  # magic, versão, capacidade
+SEQ = struct.Struct("<I")
+DADOS = struct.Struct("<B3x32sdd8x")  # status, id do nó, offset, última sincronização
+RECORD = struct.Struct("<IB3x32sdd8x")  # seq + DADOS, para leitura em lote
+RECORD_SIZE = RECORD.size  # 64 bytes
+
+STATUS_VAZIO = 0
+STATUS_SINCRONIZADO = 1
+STATUS_SEM_AJUSTE = 2
+STATUS_ERRO = 3
+
+NOMES_STATUS = {
+    STATUS_SINCRONIZADO: "sincronizado",
+    STATUS_SEM_AJUSTE: "sem ajuste",
+    STATUS_ERRO: "erro",
+}
+
+# Tentativas de leitura de um registro antes de desistir (escritor interrompido no meio)
+TENTATIVAS_LEITURA = 100
+
+
+@contextmanager
+def _travar(fd):
+    """Lock exclusivo no arquivo da tabela, usado apenas pelos escritores."""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class TabelaOffsets:
+    """
+    Acesso à tabela compartilhada de offsets.
+
+    :param caminho: Arquivo da tabela.
+    :param capacidade: Número de registros ao criar a tabela (ignorado se ela já existir).
+    :param escrita: Abre para escrita, criando a tabela se necessário.
+    """
+
+    def __init__(self, caminho=CAMINHO_PADRAO, capacidade=CAPACIDADE_PADRAO, escrita=False):
+        self.caminho = caminho
+        self.escrita = escrita
+        self.slots = {}  # id do nó -> índice do registro (cache do escritor)
+        self.lock = threading.Lock()  # flock não exclui threads que compartilham o fd
+        flags = os.O_RDWR | os.O_CREAT if escrita else os.O_RDONLY
+        self.fd = os.open(caminho, flags | getattr(os, "O_BINARY", 0))
+        try:
+            if escrita:
+                with _travar(self.fd):
+                    if os.fstat(self.fd).st_size < HEADER.size:
+                        os.ftruncate(self.fd, HEADER.size + capacidade * RECORD_SIZE)
+                        os.lseek(self.fd, 0, os.SEEK_SET)
+                        os.write(self.fd, HEADER.pack(MAGIC, VERSAO, capacidade))
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            cabecalho = os.read(self.fd, HEADER.size)
+            if len(cabecalho) < HEADER.size:
+                raise ValueError(f"Tabela de offsets '{caminho}' incompleta")
+            magic, versao, self.capacidade = HEADER.unpack(cabecalho)
+            if magic != MAGIC or versao != VERSAO:
+                raise ValueError(f"'{caminho}' não é uma tabela de offsets válida")
+            acesso = mmap.ACCESS_WRITE if escrita else mmap.ACCESS_READ
+            self.mm = mmap.mmap(
+                self.fd, HEADER.size + self.capacidade * RECORD_SIZE, access=acesso
+            )
+        except Exception:
+            os.close(self.fd)
+            raise
+
+    def fechar(self):
+        self.mm.close()
+        os.close(self.fd)
+
+    def _posicao(self, indice):
+        return HEADER.size + indice * RECORD_SIZE
+
+    def _localizar(self, nome: bytes):
+        """
+        Encontra (ou reserva) o registro do nó por endereçamento aberto a partir do hash do id.
+        Deve ser chamado com o lock de escrita.
+        """
+        inicio = zlib.crc32(nome) % self.capacidade
+        for passo in range(self.capacidade):
+            indice = (inicio + passo) % self.capacidade
+            _, nome_slot, _, _ = DADOS.unpack_from(self.mm, self._posicao(indice) + SEQ.size)
+            if nome_slot == nome or nome_slot == bytes(len(nome_slot)):
+                return indice
+        raise RuntimeError(f"Tabela de offsets '{self.caminho}' cheia")
+
+    def publicar(self, pid: str, offset: float, status: int, ultima_sync: float):
+        """Grava (ou atualiza) o registro do nó `pid` sob o seqlock."""
+        nome = pid.encode()
+        if len(nome) > 32:
+            raise ValueError(f"Identificador '{pid}' excede 32 bytes")
+        nome = nome.ljust(32, b"\0")
+        with self.lock, _travar(self.fd):
+            indice = self.slots.get(pid)
+            if indice is None:
+                indice = self.slots[pid] = self._localizar(nome)
+            pos = self._posicao(indice)
+            (seq,) = SEQ.unpack_from(self.mm, pos)
+            SEQ.pack_into(self.mm, pos, seq + 1)  # ímpar: escrita em andamento
+            DADOS.pack_into(self.mm, pos + SEQ.size, status, nome, offset, ultima_sync)
+            SEQ.pack_into(self.mm, pos, seq + 2)
+
+    def ler_todos(self):
+        """
+        Lê todos os registros publicados diretamente do mapeamento, em uma passada.
+        Um registro só é aceito se `seq` estava par e não mudou após a leitura dos campos;
+        caso contrário, é relido individualmente.
+
+        :return: Dicionário id do nó -> (offset, última sincronização, status).
+        """
+        mm = self.mm
+        resultado = {}
+        with memoryview(mm) as view:
+            registros = RECORD.iter_unpack(view[HEADER.size : self._posicao(self.capacidade)])
+            for indice, (seq, status, nome, offset, ultima_sync) in enumerate(registros):
+                if seq == 0:
+                    continue  # slot nunca utilizado
+                pos = self._posicao(indice)
+                if seq & 1 or SEQ.unpack_from(mm, pos)[0] != seq:
+                    lido = self._reler(pos)
+                    if lido is None:
+                        continue
+                    status, nome, offset, ultima_sync = lido
+                if status != STATUS_VAZIO:
+                    resultado[nome.rstrip(b"\0").decode()] = (offset, ultima_sync, status)
+            del registros
+        return resultado
+
+    def _reler(self, pos):
+        """Relê um registro sob o seqlock; None se o escritor não concluir a tempo."""
+        for _ in range(TENTATIVAS_LEITURA):
+            (seq,) = SEQ.unpack_from(self.mm, pos)
+            if seq & 1:
+                continue
+            dados = DADOS.unpack_from(self.mm, pos + SEQ.size)
+            if SEQ.unpack_from(self.mm, pos)[0] == seq:
+                return dados
+        return None
+
+    def limpar(self):
+        """Marca todos os registros como vazios, mantendo os ids reservados nos seus slots."""
+        with self.lock, _travar(self.fd):
+            for indice in range(self.capacidade):
+                pos = self._posicao(indice)
+                (seq,) = SEQ.unpack_from(self.mm, pos)
+                status, nome, offset, ultima_sync = DADOS.unpack_from(self.mm, pos + SEQ.size)
+                if status == STATUS_VAZIO:
+                    continue
+                SEQ.pack_into(self.mm, pos, seq + 1)
+                DADOS.pack_into(self.mm, pos + SEQ.size, STATUS_VAZIO, nome, 0.0, 0.0)
+                SEQ.pack_into(self.mm, pos, seq + 2)
+
+
+_escritor = None
+_escritor_lock = threading.Lock()
+
+
+def publicar(pid: str, offset: float, status: int, ultima_sync: float):
+    """Publica o offset do nó na tabela padrão, abrindo-a para escrita na primeira chamada."""
+    global _escritor
+    if _escritor is None:
+        with _escritor_lock:
+            if _escritor is None:
+                _escritor = TabelaOffsets(escrita=True)
+    _escritor.publicar(pid, offset, status, ultima_sync)
+
+
+def abrir_leitura(caminho=CAMINHO_PADRAO):
+    """Abre a tabela para leitura, ou retorna None se ela ainda não existir."""
+    if not os.path.exists(caminho):
+        return None
+    try:
+        return TabelaOffsets(caminho)
+    except ValueError:
+        return None
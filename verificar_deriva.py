@@ -0,0 +1,131 @@
+import argparse
+import glob
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+
+import relogio
+from coordinator import estimate_offset
+from round_trace import read_rounds
+
+"""
+Verificação da deriva por nó entre execuções de process.py.
+Executa duas rodadas (coordenador e um cliente com --deriva) separadas por relogio.dormir sob
+relógio virtual sem origem, como numa execução avulsa, e confere que o offset medido pelo
+coordenador na segunda rodada cresceu segundo a deriva acumulada no intervalo.
+"""
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+HOST = "127.0.0.1"
+
+
+def porta_livre() -> int:
+    """Reserva temporariamente uma porta TCP livre em HOST."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def executar_rodada(pasta: str, deslocamento: float, ppm: float) -> float:
+    """
+    Executa uma rodada com um único cliente sob o tempo virtual `deslocamento`.
+
+    :return: Offset do cliente estimado pelo coordenador nessa rodada.
+    """
+    # Especificação sem origem: cada nó usa a origem de deriva persistida em disco
+    ambiente = dict(os.environ, **{relogio.VARIAVEL_AMBIENTE: f"virtual:{deslocamento!r}"})
+    porta = porta_livre()
+    coord = subprocess.Popen(
+        [
+            sys.executable,
+            "-u",
+            os.path.join(DIRETORIO, "coordinator.py"),
+            "--host",
+            HOST,
+            "--port",
+            str(porta),
+            "--clients",
+            "1",
+            "--trace-dir",
+            pasta,
+        ],
+        cwd=pasta,
+        env=ambiente,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    try:
+        for linha in coord.stdout:
+            if "Escutando" in linha:
+                break
+        threading.Thread(target=coord.stdout.read, daemon=True).start()
+        subprocess.run(
+            [
+                sys.executable,
+                os.path.join(DIRETORIO, "process.py"),
+                "--host",
+                HOST,
+                "--port",
+                str(porta),
+                "--id",
+                "D1",
+                "--deriva",
+                str(ppm),
+            ],
+            cwd=pasta,
+            env=ambiente,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        coord.wait()
+    finally:
+        if coord.poll() is None:
+            coord.kill()
+
+    ultima = None
+    for trace in glob.glob(os.path.join(pasta, "trace_*.bin")):
+        for _, _, registros in read_rounds(trace):
+            ultima = registros
+    if not ultima:
+        raise RuntimeError("Nenhuma medição registrada no trace")
+    t0, t2, client_time, _, _, _ = ultima[-1]
+    return estimate_offset(t0, t2, client_time)
+
+
+def main():
+    """
+    Mede o offset do cliente em duas execuções separadas por `--intervalo` segundos virtuais
+    e falha (código 1) se a diferença não acompanhar a deriva esperada (ppm × intervalo).
+    """
+    parser = argparse.ArgumentParser(description="Verifica a deriva acumulada entre execuções")
+    parser.add_argument("--deriva", type=float, default=100.0, help="Deriva do cliente (ppm)")
+    parser.add_argument(
+        "--intervalo", type=float, default=3600.0, help="Intervalo virtual entre as execuções (s)"
+    )
+    args = parser.parse_args()
+
+    virtual = relogio.RelogioVirtual()
+    with tempfile.TemporaryDirectory() as pasta:
+        primeira = executar_rodada(pasta, virtual.deslocamento, args.deriva)
+        virtual.dormir(args.intervalo)
+        segunda = executar_rodada(pasta, virtual.deslocamento, args.deriva)
+
+    # O ajuste da primeira rodada é desprezível, pois a deriva acumulada ainda é ~0
+    esperado = args.deriva * 1e-6 * args.intervalo
+    divergencia = segunda - primeira
+    print(
+        f"1ª execução: {primeira:+.6f}s | 2ª execução: {segunda:+.6f}s | "
+        f"divergência {divergencia:+.6f}s (esperado {esperado:+.6f}s)"
+    )
+    if abs(divergencia - esperado) > max(abs(esperado) * 0.1, 0.005):
+        print("Falha: a deriva não se acumulou entre as execuções.")
+        sys.exit(1)
+    print("OK: a deriva se acumulou entre as execuções.")
+
+
+if __name__ == "__main__":
+    main()